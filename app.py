@@ -1,11 +1,30 @@
 import os
-import requests
+import html
+import json
+import uuid
+import time
+import sqlite3
 import datetime
-from dotenv import load_dotenv
+import env  # loads .env once per process, before the imports below read their settings
 import streamlit as st
-from groq import Groq
-import firebase_admin
-from firebase_admin import credentials, auth, firestore
+import streamlit.components.v1 as components
+from firebase_admin import auth
+from llm import stream_completion, complete
+from scheduler import SchedulerBusy, BUSY_MESSAGE
+from conversation import Transcript
+from router import route
+from industries import get_growing_industries, industry_overview
+from canned import canned_reply
+from prefetch import PREFETCH_ENABLED, start_prefetch
+from faq import stored_reply
+from timing import span, record, begin_rerun, end_rerun
+from journal import get_journal
+from transcript_cache import TRANSCRIPT_SYNC_OVERLAP_SECONDS, get_transcript_cache, utc_naive
+from chat_store import get_chat_store
+from identity import sign_in, refresh_id_token
+from sessions import SESSION_TTL_SECONDS, get_session_store
+from hydration import Hydration
+from clients import get_clients
 
 # Page configuration
 st.set_page_config(
@@ -15,67 +34,40 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Load environment variables
-load_dotenv()
+# Time every rerun and its phases per session (histograms and log in timing.py)
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex[:12]
+    st.session_state.rerun_count = 0
+st.session_state.rerun_count += 1
+begin_rerun(st.session_state.session_id, st.session_state.rerun_count)
+
+def rerun():
+    # st.rerun() ends the script early, so close this run's span first
+    end_rerun()
+    st.rerun()
+
+# Clients are built once per process and shared by every session (clients.py)
+clients = get_clients()
 api_key = os.getenv("GROQ_API_KEY")
 #api_key = st.secrets["general"]["GROQ_API_KEY"]
 if not api_key:
     st.error("GROQ_API_KEY not found in .env file")
     st.stop()
 
-# Initialize Groq client
-client = Groq(api_key=api_key)
-
-# Initialize Firebase
-if not firebase_admin._apps:
-    cred = credentials.Certificate("key.json")
-    firebase_admin.initialize_app(cred)
-db = firestore.client()
-
-# ----------------- Industry Data ------------------
-def get_growing_industries():
-    return [
-        {
-            "industry": "Technology", 
-            "growth_estimate": "5-10% annually", 
-            "icon": "💻", 
-            "description": "The technology sector continues to expand with innovations in AI, cloud computing, and cybersecurity. Careers in software development, data science, and IT infrastructure are in high demand worldwide.",
-            "key_skills": ["Python/Java", "Machine Learning", "Cloud Architecture", "Cybersecurity", "Agile Methodologies"],
-            "subjects": ["Computer Science", "Data Structures", "Algorithms", "Mathematics", "Statistics"]
-        },
-        {
-            "industry": "Healthcare", 
-            "growth_estimate": "7-12% annually", 
-            "icon": "🏥", 
-            "description": "Healthcare is experiencing rapid growth due to aging populations and medical advancements. Opportunities abound in nursing, medical technology, healthcare administration, and specialized medicine.",
-            "key_skills": ["Patient Care", "Medical Knowledge", "Technical Skills", "Communication", "Problem Solving"],
-            "subjects": ["Biology", "Chemistry", "Anatomy", "Nursing", "Public Health"]
-        },
-        {
-            "industry": "Renewable Energy", 
-            "growth_estimate": "8-15% annually", 
-            "icon": "🌱", 
-            "description": "The shift toward sustainable energy solutions is creating jobs in solar/wind technology, energy storage, and green infrastructure development.",
-            "key_skills": ["Engineering", "Project Management", "Technical Design", "Environmental Regulations", "Data Analysis"],
-            "subjects": ["Environmental Science", "Engineering", "Physics", "Chemistry", "Sustainability"]
-        },
-        {
-            "industry": "E-commerce", 
-            "growth_estimate": "10-20% annually", 
-            "icon": "🛒", 
-            "description": "Online retail continues to transform the shopping experience, driving demand for digital marketing specialists, logistics coordinators, and UX designers.",
-            "key_skills": ["Digital Marketing", "Data Analytics", "Supply Chain Management", "Customer Service", "UI/UX Design"],
-            "subjects": ["Business", "Marketing", "Computer Science", "Statistics", "Graphic Design"]
-        },
-        {
-            "industry": "Cybersecurity", 
-            "growth_estimate": "15-25% annually", 
-            "icon": "🔒", 
-            "description": "With increasing digital threats, cybersecurity professionals are needed across all sectors to protect data and infrastructure.",
-            "key_skills": ["Network Security", "Ethical Hacking", "Risk Assessment", "Cryptography", "Incident Response"],
-            "subjects": ["Computer Science", "Information Technology", "Mathematics", "Network Engineering", "Criminal Justice"]
-        }
-    ]
+client = clients.groq()
+# Stream replies token by token into the chat (set STREAM_REPLIES=0 to wait for the full reply)
+STREAM_REPLIES = os.getenv("STREAM_REPLIES", "1") != "0"
+
+db = clients.firestore()
+# Per-message documents or chunked conversations, set by CHAT_LAYOUT (see migrate_chunks.py)
+chat_store = get_chat_store(db)
+# Login reads only the newest page of chat history; older pages load on request
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "50"))
+# Returning users download only chats newer than their locally cached history
+transcript_cache = get_transcript_cache()
+# "Remember me" logins survive a browser reload (REMEMBER_ME=0 turns the option off)
+session_store = get_session_store()
+SESSION_COOKIE = "advisor_session"
 
 # ----------------- Authentication Functions ------------------
 def create_account(email, password, confirm_password, username):
@@ -89,25 +81,19 @@ def create_account(email, password, confirm_password, username):
         if password != confirm_password:
             return False, "Passwords do not match"
             
+        # create_user rejects a taken email itself, so no lookup beforehand
         try:
-            auth.get_user_by_email(email)
+            with span("create_user"):
+                user = auth.create_user(
+                    email=email,
+                    password=password,
+                    display_name=username
+                )
+        except auth.EmailAlreadyExistsError:
             return False, "Email already in use"
-        except auth.UserNotFoundError:
-            pass
-            
-        user = auth.create_user(
-            email=email,
-            password=password,
-            display_name=username
-        )
         
-        db.collection("users").document(user.uid).set({
-            "email": email,
-            "username": username,
-            "created_at": datetime.datetime.now(),
-            "interests": [],
-            "profile_completion": 35
-        })
+        # The profile document is written in the background; logging in does not wait for it
+        save_profile(profile_record(user.uid, email, username))
         
         return True, "Account created successfully!"
     except Exception as e:
@@ -116,56 +102,308 @@ def create_account(email, password, confirm_password, username):
 def login_user(email, password):
     try:
         if not email or not password:
-            return None, None, "Email and password are required"
+            return None, None, "Email and password are required", None
             
         API_KEY = os.getenv("FIREBASE_API_KEY")
         if not API_KEY:
-            return None, None, "Firebase API key not configured"
+            return None, None, "Firebase API key not configured", None
             
-        url = f"https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key={API_KEY}"
-        payload = {
-            "email": email,
-            "password": password,
-            "returnSecureToken": True
-        }
-        response = requests.post(url, json=payload)
-        result = response.json()
+        # One round trip on a pooled keep-alive connection; identity comes from the response itself
+        with span("identity_signin") as fields:
+            result, timings = sign_in(email, password, API_KEY)
+            fields.update(timings)
+        record("identity_response", timings["response"], reused=timings["reused"])
 
         if "idToken" in result:
-            user = auth.get_user_by_email(email)
-            return user.uid, user.display_name or email.split('@')[0], "success"
+            tokens = {"id_token": result["idToken"], "refresh_token": result["refreshToken"], "expires_in": result["expiresIn"]}
+            return result["localId"], result.get("displayName") or email.split('@')[0], "success", tokens
         else:
             error = result.get("error", {}).get("message", "Login failed")
-            return None, None, error
+            return None, None, error, None
             
     except Exception as e:
-        return None, None, str(e)
+        return None, None, str(e), None
+
+def user_agent():
+    return st.context.headers.get("User-Agent", "")
+
+def write_session_cookie(value, max_age):
+    # Streamlit cannot set cookies; this zero-height component writes one on the app's own origin
+    script = (
+        f"parent.document.cookie = {json.dumps(f'{SESSION_COOKIE}={value}; Max-Age={max_age}; Path=/; SameSite=Strict')}"
+        " + (parent.location.protocol === 'https:' ? '; Secure' : '');"
+    )
+    page = f"<script>{script}</script>"
+    if hasattr(st, "iframe"):
+        st.iframe(page, height="content")
+    else:
+        components.html(page, height=0)
+
+def restore_session(key):
+    # Returns the remembered user for this browser's session key, or None to show the login form
+    try:
+        remembered = session_store.get(key, user_agent())
+        if remembered is None:
+            return None
+        # The common case: the ID token is still valid and its signature checks out against cached public keys
+        if remembered["expires_at"] > time.time() + 60:
+            try:
+                with span("verify_id_token"):
+                    claims = auth.verify_id_token(remembered["id_token"])
+                if claims.get("uid") == remembered["uid"]:
+                    return remembered
+            except (ValueError, auth.InvalidIdTokenError, auth.CertificateFetchError):
+                pass
+        # Expired or rejected: one call to the token endpoint on the pooled session
+        with span("identity_refresh") as fields:
+            result, timings = refresh_id_token(remembered["refresh_token"], os.getenv("FIREBASE_API_KEY"))
+            fields.update(timings)
+        if result.get("user_id") != remembered["uid"] or "id_token" not in result:
+            # Revoked, disabled or deleted; the user has to log in again
+            session_store.delete(key)
+            return None
+        session_store.update_tokens(key, result["id_token"], result["refresh_token"], result["expires_in"])
+        return remembered
+    except Exception:
+        return None
 
 # ----------------- Chat Storage Functions ------------------
-def save_message(uid, role, content):
-    db.collection("users").document(uid).collection("chats").add({
-        "role": role,
-        "content": content,
-        "timestamp": datetime.datetime.now()
-    })
+def chat_record(role, content):
+    # The document id is chosen here, so writing the same record again overwrites instead of duplicating
+    return {"id": uuid.uuid4().hex, "role": role, "content": content, "timestamp": datetime.datetime.now()}
+
+def write_chat_records(records):
+    # One atomic batch in the configured layout; replaying the same records is harmless
+    chat_store.write(records)
+
+def profile_record(uid, email, username):
+    # Keyed by uid, so a retried or replayed write lands on the same users/{uid} document
+    return {"kind": "profile", "uid": uid, "id": uid, "email": email, "username": username,
+            "timestamp": datetime.datetime.now()}
+
+def profile_fields(record):
+    return {
+        "email": record["email"],
+        "username": record["username"],
+        "created_at": record["timestamp"],
+        "interests": [],
+        "profile_completion": 35
+    }
+
+def write_journal_entries(entries):
+    # Sign-up profiles share the journal with chat messages
+    profiles = [entry for entry in entries if entry.get("kind") == "profile"]
+    if profiles:
+        batch = db.batch()
+        for entry in profiles:
+            batch.set(db.collection("users").document(entry["uid"]), profile_fields(entry), merge=True)
+        batch.commit()
+    chats = [entry for entry in entries if entry.get("kind") != "profile"]
+    if chats:
+        write_chat_records(chats)
+
+# Turns are acknowledged once they are in the local journal and reach Firestore in the background
+journal = get_journal(write_journal_entries, db)
+
+def save_profile(record):
+    with span("save_profile", journal=journal is not None):
+        if journal:
+            journal.append([record])
+        else:
+            write_journal_entries([record])
+
+def save_turn(uid, *records):
+    # A question and its reply are persisted together
+    with span("save_turn", messages=len(records), journal=journal is not None):
+        records = [dict(record, uid=uid) for record in records]
+        if journal:
+            journal.append(records)
+        else:
+            write_chat_records(records)
 
-def load_messages(uid):
-    messages = []
-    docs = db.collection("users").document(uid).collection("chats").order_by("timestamp").stream()
-    for doc in docs:
-        messages.append(doc.to_dict())
+def save_unanswered(uid, record):
+    # Keeps the question when no reply could be produced; a storage failure here must not hide the notice
+    try:
+        save_turn(uid, record)
+    except Exception:
+        pass
+
+def fetch_messages(uid, limit, before=None):
+    # The newest `limit` messages older than `before`, oldest first, and whether any older remain
+    with span("fetch_messages", layout=chat_store.name) as fields:
+        messages, has_more = chat_store.fetch_page(uid, limit, before)
+        fields["messages"] = len(messages)
+    return messages, has_more
+
+def fetch_newer(uid, after):
+    # Delta sync: only the chats written since the cached watermark
+    with span("fetch_newer", layout=chat_store.name) as fields:
+        messages = chat_store.fetch_newer(uid, after)
+        fields["messages"] = len(messages)
     return messages
 
+def load_cached_messages(uid, limit, before=None):
+    if before is None:
+        watermark = transcript_cache.watermark(uid)
+        if watermark is None:
+            page, has_more = fetch_messages(uid, limit)
+            transcript_cache.merge(uid, page, older_remaining=has_more)
+        else:
+            # Timestamps are set by the writer and journaled chats land late, so re-read a window below the watermark
+            since = watermark - datetime.timedelta(seconds=TRANSCRIPT_SYNC_OVERLAP_SECONDS)
+            transcript_cache.merge(uid, fetch_newer(uid, since))
+    messages, has_more = transcript_cache.page(uid, limit, before)
+    if len(messages) < limit and has_more:
+        # The cache ran out before the page did; the rest comes from Firestore
+        oldest = messages[0]["timestamp"] if messages else before
+        older, has_more = fetch_messages(uid, limit - len(messages), oldest)
+        transcript_cache.merge(uid, older, older_remaining=has_more)
+        messages = older + messages
+    return messages, has_more
+
+def load_messages(uid, limit=HISTORY_PAGE_SIZE, before=None):
+    with span("load_messages", cached=transcript_cache is not None) as fields:
+        messages = None
+        if transcript_cache is not None:
+            try:
+                messages, has_more = load_cached_messages(uid, limit, before)
+            except sqlite3.Error as e:
+                # A broken or busy cache must not fail the login; read Firestore directly
+                fields["cache_error"] = f"{type(e).__name__}: {e}"
+        if messages is None:
+            messages, has_more = fetch_messages(uid, limit, before)
+        fields["messages"] = len(messages)
+    if journal and before is None:
+        # The newest messages may still be waiting in the journal
+        stored = {msg["id"] for msg in messages}
+        unflushed = [msg for msg in journal.pending(uid) if msg.get("kind") != "profile" and msg["id"] not in stored]
+        if unflushed:
+            messages = sorted(messages + unflushed, key=lambda msg: utc_naive(msg["timestamp"]))
+    return messages, has_more
+
+def save_summary(uid, summary, through):
+    # The rolling summary lives next to the chats so a restored session can reuse it
+    with span("save_summary"):
+        db.collection("users").document(uid).collection("summaries").document("current").set({
+            "content": summary,
+            "through": through,
+            "updated_at": datetime.datetime.now()
+        })
+
+def load_summary(uid):
+    with span("load_summary"):
+        doc = db.collection("users").document(uid).collection("summaries").document("current").get()
+    return doc.to_dict() if doc.exists else None
+
+def load_profile(uid):
+    # users/{uid} carries the interests and profile completion written at sign-up
+    with span("load_profile"):
+        doc = db.collection("users").document(uid).get()
+    profile = doc.to_dict() if doc.exists else {}
+    if journal and "profile_completion" not in profile:
+        # A new account's profile may still be waiting in the journal
+        unflushed = [entry for entry in journal.pending(uid) if entry.get("kind") == "profile"]
+        if unflushed:
+            profile = dict(profile, **profile_fields(unflushed[-1]))
+    return profile
+
 # ----------------- Session Initialization ------------------
 if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
     st.session_state.email = ""
     st.session_state.uid = ""
     st.session_state.username = ""
-    st.session_state.messages = []
-    st.session_state.conversation_history = [
-        {"role": "system", "content": "You are a career advisor chatbot that provides detailed, personalized advice about career paths, job recommendations, and industry trends."}
-    ]
+    # Displayed messages and model context share one store
+    st.session_state.transcript = Transcript()
+    st.session_state.history_has_more = False
+    st.session_state.reply_timings = []
+    # Filled in from users/{uid} after login; None until it has been read
+    st.session_state.profile = None
+    st.session_state.hydration = None
+    # Remember-me key of this session, and a cookie change still to be sent to the browser
+    st.session_state.session_key = None
+    st.session_state.cookie_update = None
+    st.session_state.restore_checked = False
+
+def discard_prefetch():
+    # A prefetched answer was written for the current transcript and must not outlive it
+    if st.session_state.get("prefetch"):
+        st.session_state.prefetch.discard()
+    st.session_state.prefetch = None
+
+def open_session(uid, email, username):
+    # All of the user's reads start at once; only the transcript and its summary hold up the first render
+    hydration = Hydration({
+        "messages": lambda: load_messages(uid),
+        "summary": lambda: load_summary(uid),
+        "profile": lambda: load_profile(uid)
+    })
+    with span("hydrate_transcript"):
+        messages, has_more = hydration.result("messages")
+        summary = hydration.result("summary")
+    st.session_state.logged_in = True
+    st.session_state.uid = uid
+    st.session_state.email = email
+    st.session_state.username = username
+    st.session_state.transcript = Transcript.restore(messages, summary)
+    st.session_state.history_has_more = has_more
+    st.session_state.profile = None
+    st.session_state.hydration = hydration
+
+# A reload starts a fresh session; pick the login back up from the cookie, once per session
+if not st.session_state.restore_checked:
+    st.session_state.restore_checked = True
+    key = st.context.cookies.get(SESSION_COOKIE) if session_store else None
+    if key:
+        with span("restore_session"):
+            remembered = restore_session(key)
+        if remembered:
+            st.session_state.session_key = key
+            open_session(remembered["uid"], remembered["email"], remembered["username"])
+        else:
+            st.session_state.cookie_update = ("", 0)
+
+# Set on login and cleared on logout; sent on the run after, since those end with a rerun
+if st.session_state.cookie_update:
+    write_session_cookie(*st.session_state.cookie_update)
+    st.session_state.cookie_update = None
+
+# ----------------- Profile ------------------
+def render_profile(profile):
+    interests = profile.get("interests") or []
+    st.markdown("### 🔍 Recommendations")
+    picks = f"Based on your interests: **{', '.join(interests[:3])}**" if interests else "Add your interests for tailored picks"
+    st.markdown(f"""
+    - 🎯 {picks}
+    - 📈 Trending: **AI Engineering**
+    - 💡 Suggested: **Update your skills**
+    """)
+    st.markdown("### 📊 Profile Completion")
+    st.progress(min(max(int(profile.get("profile_completion") or 0), 0), 100))
+    st.caption("Complete your profile for better recommendations")
+
+# ----------------- Chat Bubbles ------------------
+# User and model text is escaped: any markup in it could run script that reads the remember-me cookie
+def user_bubble(content):
+    content = html.escape(content)
+    return f"""
+    <div style="background: linear-gradient(135deg, #4a8cff 0%, #3a7bf0 100%); 
+                color: white; padding: 15px 20px; border-radius: 18px 4px 18px 18px; 
+                margin: 10px 0 10px auto; max-width: 75%; box-shadow: 0 3px 10px rgba(0,0,0,0.1);">
+        {content}
+    </div>
+    """
+
+def assistant_bubble(content):
+    content = html.escape(content)
+    return f"""
+    <div style="background: linear-gradient(135deg, #f1f3f6 0%, #e9ecef 100%); 
+                color: #2c3e50; padding: 15px 20px; border-radius: 4px 18px 18px 18px; 
+                margin: 10px auto 10px 0; max-width: 75%; box-shadow: 0 3px 10px rgba(0,0,0,0.1); 
+                border-left: 4px solid #4a8cff;">
+        {content}
+    </div>
+    """
 
 # ----------------- Custom CSS ------------------
 st.markdown("""
@@ -266,6 +504,7 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ----------------- Enhanced Sidebar ------------------
+profile_slot = None
 with st.sidebar:
     if st.session_state.logged_in:
         # Profile Section
@@ -275,7 +514,7 @@ with st.sidebar:
             <h3>{}</h3>
             <p style="color: rgba(255,255,255,0.8);">{}</p>
         </div>
-        """.format(st.session_state.username, st.session_state.email), unsafe_allow_html=True)
+        """.format(html.escape(st.session_state.username), html.escape(st.session_state.email)), unsafe_allow_html=True)
         
         st.divider()
         
@@ -284,11 +523,20 @@ with st.sidebar:
         col1, col2 = st.columns(2)
         with col1:
             if st.button("🔄 Refresh", help="Refresh the chat"):
-                st.rerun()
+                # Drop this user's cached history and reload it from Firestore
+                if transcript_cache:
+                    transcript_cache.invalidate(st.session_state.uid)
+                st.session_state.profile = None
+                st.session_state.hydration = None
+                messages, st.session_state.history_has_more = load_messages(st.session_state.uid)
+                st.session_state.transcript = Transcript.restore(messages, load_summary(st.session_state.uid))
+                rerun()
         with col2:
             if st.button("🧹 New Chat", help="Start new conversation"):
-                st.session_state.messages = []
-                st.rerun()
+                discard_prefetch()
+                st.session_state.transcript = Transcript()
+                st.session_state.history_has_more = False
+                rerun()
         
         # Notifications
         notification_container = st.container()
@@ -311,22 +559,17 @@ with st.sidebar:
                     """)
                     if st.button("Mark all as read"):
                         st.session_state.show_notifications = False
-                        st.rerun()
+                        rerun()
         
         st.divider()
         
-        # Recommendations
-        st.markdown("### 🔍 Recommendations")
-        st.markdown("""
-        - 🎯 Based on your interests: **Technology**
-        - 📈 Trending: **AI Engineering**
-        - 💡 Suggested: **Update your skills**
-        """)
-        
-        # Progress Tracker
-        st.markdown("### 📊 Profile Completion")
-        st.progress(65)
-        st.caption("Complete your profile for better recommendations")
+        # Recommendations and profile completion; filled in at the end of the run while the profile is loading
+        profile_slot = st.empty()
+        if st.session_state.profile is not None:
+            with profile_slot.container():
+                render_profile(st.session_state.profile)
+        else:
+            profile_slot.caption("Loading your profile…")
         if st.button("Complete Profile →"):
             st.toast("Redirecting to profile settings...")
         
@@ -343,16 +586,22 @@ with st.sidebar:
         # Logout
         st.divider()
         if st.button("🚪 Logout", type="primary"):
+            if st.session_state.session_key:
+                session_store.delete(st.session_state.session_key)
+                st.session_state.session_key = None
+                st.session_state.cookie_update = ("", 0)
+            discard_prefetch()
+            st.session_state.pending_turn = None
             st.session_state.logged_in = False
             st.session_state.uid = ""
             st.session_state.email = ""
             st.session_state.username = ""
-            st.session_state.messages = []
-            st.session_state.conversation_history = [
-                {"role": "system", "content": "You are a career advisor chatbot that provides detailed, personalized advice about career paths, job recommendations, and industry trends."}
-            ]
+            st.session_state.transcript = Transcript()
+            st.session_state.history_has_more = False
+            st.session_state.profile = None
+            st.session_state.hydration = None
             st.success("You have been logged out.")
-            st.rerun()
+            rerun()
     else:
         # Login/Create Account Form
         st.markdown("""
@@ -378,27 +627,33 @@ with st.sidebar:
                     confirm_password = st.text_input("Confirm Password", type="password")
                 
                 if st.form_submit_button("Create Account", type="primary"):
-                    success, message = create_account(email, password, confirm_password, username)
+                    with span("signup"):
+                        success, message = create_account(email, password, confirm_password, username)
                     if success:
                         st.success(message)
                         st.session_state.email = email  
-                        st.rerun()
+                        rerun()
                     else:
                         st.error(message)
             
             else:  # Login tab
                 email = st.text_input("Email Address", value=st.session_state.get("email", ""))
                 password = st.text_input("Password", type="password")
+                remember = st.checkbox("Remember me on this browser", value=False) if session_store else False
                 
                 if st.form_submit_button("Login", type="primary"):
-                    uid, username, message = login_user(email, password)
+                    with span("login"):
+                        uid, username, message, tokens = login_user(email, password)
                     if uid:
-                        st.session_state.logged_in = True
-                        st.session_state.uid = uid
-                        st.session_state.email = email
-                        st.session_state.username = username
-                        st.session_state.messages = load_messages(uid)
-                        st.rerun()
+                        if remember:
+                            # The browser keeps only an opaque key in a cookie; the tokens stay on the server
+                            st.session_state.session_key = session_store.create(
+                                uid, email, username, tokens["id_token"], tokens["refresh_token"], tokens["expires_in"],
+                                user_agent()
+                            )
+                            st.session_state.cookie_update = (st.session_state.session_key, int(SESSION_TTL_SECONDS))
+                        open_session(uid, email, username)
+                        rerun()
                     else:
                         st.error(message)
 
@@ -449,25 +704,14 @@ if st.session_state.logged_in:
             """, unsafe_allow_html=True)
             
             if st.button(f"View {industry['industry']} careers", key=f"industry_{idx}"):
-                response = f"""
-                **{industry['icon']} {industry['industry']} Career Overview**  
-                
-                📈 **Growth Projection:** {industry['growth_estimate']}  
-                
-                🛠️ **Key Skills in Demand:**  
-                {', '.join(industry['key_skills'])}  
-                
-                📚 **Relevant Education:**  
-                {', '.join(industry['subjects'])}  
-                
-                ℹ️ **Industry Insight:**  
-                {industry['description']}  
-                
-                💡 **Career Advice:** What specific aspect of {industry['industry']} careers would you like to explore?
-                """
-                st.session_state.messages.append({"role": "assistant", "content": response})
-                save_message(st.session_state.uid, "assistant", response)
-                st.rerun()
+                response = chat_record("assistant", industry_overview(industry))
+                save_turn(st.session_state.uid, response)
+                st.session_state.transcript.add("assistant", response["content"], response["timestamp"])
+                if PREFETCH_ENABLED:
+                    # Generate the likely follow-up answer at low priority while the user reads
+                    discard_prefetch()
+                    st.session_state.prefetch = start_prefetch(client, st.session_state.transcript, industry)
+                rerun()
 
     # Chat container with bottom padding for fixed input
     with st.container():
@@ -481,7 +725,7 @@ if st.session_state.logged_in:
         """, unsafe_allow_html=True)
         
         # Welcome message if empty
-        if not st.session_state.messages:
+        if not st.session_state.transcript.messages:
             st.markdown(f"""
             <div style="background: linear-gradient(135deg, #e6f2ff 0%, #d6e8ff 100%); 
                         color: #2c3e50; padding: 25px; border-radius: 15px; margin: 20px auto; 
@@ -509,25 +753,21 @@ if st.session_state.logged_in:
             </div>
             """, unsafe_allow_html=True)
             
+        # Older history is fetched a page at a time
+        if st.session_state.history_has_more and st.session_state.transcript.messages:
+            if st.button("⬆️ Load older messages", key="load_older"):
+                oldest = st.session_state.transcript.messages[0]["timestamp"]
+                older, st.session_state.history_has_more = load_messages(st.session_state.uid, before=oldest)
+                st.session_state.transcript.prepend(older)
+                rerun()
+        
         # Display messages
-        for msg in st.session_state.messages:
-            if msg['role'] == "user":
-                st.markdown(f"""
-                <div style="background: linear-gradient(135deg, #4a8cff 0%, #3a7bf0 100%); 
-                            color: white; padding: 15px 20px; border-radius: 18px 4px 18px 18px; 
-                            margin: 10px 0 10px auto; max-width: 75%; box-shadow: 0 3px 10px rgba(0,0,0,0.1);">
-                    {msg["content"]}
-                </div>
-                """, unsafe_allow_html=True)
-            else:
-                st.markdown(f"""
-                <div style="background: linear-gradient(135deg, #f1f3f6 0%, #e9ecef 100%); 
-                            color: #2c3e50; padding: 15px 20px; border-radius: 4px 18px 18px 18px; 
-                            margin: 10px auto 10px 0; max-width: 75%; box-shadow: 0 3px 10px rgba(0,0,0,0.1); 
-                            border-left: 4px solid #4a8cff;">
-                    {msg["content"]}
-                </div>
-                """, unsafe_allow_html=True)
+        with span("render_history", messages=len(st.session_state.transcript.messages)):
+            for msg in st.session_state.transcript.messages:
+                if msg['role'] == "user":
+                    st.markdown(user_bubble(msg["content"]), unsafe_allow_html=True)
+                else:
+                    st.markdown(assistant_bubble(msg["content"]), unsafe_allow_html=True)
             
         st.markdown('</div>', unsafe_allow_html=True)
 
@@ -567,121 +807,119 @@ if st.session_state.logged_in:
     st.markdown("</div>", unsafe_allow_html=True)
 
     if user_input:
-        st.session_state.messages.append({"role": "user", "content": user_input})
-        save_message(st.session_state.uid, "user", user_input)
-        
-        try:
-            st.session_state.conversation_history.append({"role": "user", "content": user_input})
+        transcript = st.session_state.transcript
+        # A double submit or rerun race while this turn is still generating is not saved twice;
+        # the rerun rejoins the in-flight completion and reuses the pending question's record
+        pending = st.session_state.get("pending_turn")
+        duplicate = (
+            pending is not None
+            and pending["content"] == user_input
+            and bool(transcript.messages)
+            and transcript.messages[-1]["role"] == "user"
+            and transcript.messages[-1]["content"] == user_input
+        )
+        if duplicate:
+            question = pending
+        else:
+            first_turn = not any(m["role"] == "user" for m in transcript.messages)
+            # The question is saved together with its reply once the turn completes
+            question = chat_record("user", user_input)
+            transcript.add("user", user_input, question["timestamp"])
+            st.session_state.pending_turn = question
             
-            completion = client.chat.completions.create(
-                model="llama3-70b-8192",
-                messages=st.session_state.conversation_history,
-                temperature=0.7,
-                max_tokens=1024
-            )
-            bot_reply = completion.choices[0].message.content
+            # Welcome-menu choices (1-5) are answered locally without an LLM round trip
+            canned = canned_reply(user_input, first_turn)
+            if canned is not None:
+                answer = chat_record("assistant", canned)
+                save_turn(st.session_state.uid, question, answer)
+                transcript.add("assistant", canned, answer["timestamp"])
+                st.session_state.pending_turn = None
+                rerun()
             
-            st.session_state.messages.append({"role": "assistant", "content": bot_reply})
-            st.session_state.conversation_history.append({"role": "assistant", "content": bot_reply})
-            save_message(st.session_state.uid, "assistant", bot_reply)
-            st.rerun()
-                
-        except Exception as e:
-            error_msg = "⚠️ Sorry, I'm having trouble responding right now. Please try again later."
-            st.session_state.messages.append({"role": "assistant", "content": error_msg})
-            st.rerun()
-
-# ... (keep the rest of the code the same)
-    # # Chat container
-    # with st.container():
-    #     st.markdown('<div style="height: calc(100vh - 500px); overflow-y: auto; padding: 20px 5%; margin-bottom: 120px;">', unsafe_allow_html=True)
-        
-        # Welcome message if empty
-        if not st.session_state.messages:
-            st.markdown(f"""
-            <div style="background: linear-gradient(135deg, #e6f2ff 0%, #d6e8ff 100%); 
-                        color: #2c3e50; padding: 25px; border-radius: 15px; margin: 20px auto; 
-                        max-width: 80%; box-shadow: 0 3px 15px rgba(0,0,0,0.1); 
-                        border-left: 5px solid #4a8cff;">
-                <h2 style="margin-top: 0;">Hello {st.session_state.username}! 👋</h2>
-                <p>I'm your personal Career Advisor. Here's how I can help:</p>
-            </div>
-            """, unsafe_allow_html=True)
+            # A follow-up to an opened industry card may already be answered
+            slot = st.session_state.get("prefetch")
+            st.session_state.prefetch = None
+            prefetched = slot.take(user_input) if slot else None
+            if prefetched:
+                answer = chat_record("assistant", prefetched)
+                save_turn(st.session_state.uid, question, answer)
+                transcript.add("assistant", prefetched, answer["timestamp"])
+                st.session_state.pending_turn = None
+                rerun()
             
-            st.markdown("""
-            <div style="background: white; border-radius: 10px; padding: 20px; margin: 20px auto; 
-                        max-width: 80%; box-shadow: 0 3px 15px rgba(0,0,0,0.05);">
-                <h4 style="margin-top: 0; color: #4a8cff;">How can I help you today?</h4>
-                <ol style="padding-left: 25px; font-size: 16px; line-height: 1.6;">
-                    <li style="margin-bottom: 12px; padding-left: 10px;">Explore new career paths</li>
-                    <li style="margin-bottom: 12px; padding-left: 10px;">Get job recommendations</li>
-                    <li style="margin-bottom: 12px; padding-left: 10px;">Learn about industry trends</li>
-                    <li style="margin-bottom: 12px; padding-left: 10px;">Resume/Interview preparation</li>
-                    <li style="margin-bottom: 12px; padding-left: 10px;">Other career advice</li>
-                </ol>
-                <p style="font-style: italic; color: #666; margin: 15px 0 5px 0; font-size: 14px;">
-                    Type the number of your choice (1-5) or ask your question directly
-                </p>
-            </div>
-            """, unsafe_allow_html=True)
+            # Common industry questions are pre-generated off-peak by faq_batch.py. They were written without
+            # any conversation, so only an opening question or a follow-up to an opened card may get one.
+            stored = stored_reply(user_input, transcript.build())
+            if stored:
+                answer = chat_record("assistant", stored)
+                save_turn(st.session_state.uid, question, answer)
+                transcript.add("assistant", stored, answer["timestamp"])
+                st.session_state.pending_turn = None
+                rerun()
+        
+        try:
+            if transcript.needs_summary():
+                # Fold older turns into a compact summary to stay inside the context window
+                with span("summary_fold"):
+                    summary, through = transcript.fold(client)
+                if summary:
+                    save_summary(st.session_state.uid, summary, through)
+            with span("build_prompt"):
+                prompt = transcript.build()
+            # Short and menu-style turns go to a smaller, faster model
+            choice = route(user_input)
             
-        # Display messages
-        for msg in st.session_state.messages:
-            if msg['role'] == "user":
-                st.markdown(f"""
-                <div style="background: linear-gradient(135deg, #4a8cff 0%, #3a7bf0 100%); 
-                            color: white; padding: 15px 20px; border-radius: 18px 4px 18px 18px; 
-                            margin: 10px 0 10px auto; max-width: 75%; box-shadow: 0 3px 10px rgba(0,0,0,0.1);">
-                    {msg["content"]}
-                </div>
-                """, unsafe_allow_html=True)
+            if STREAM_REPLIES:
+                # Draw tokens into the assistant bubble as they arrive
+                if not duplicate:
+                    st.markdown(user_bubble(user_input), unsafe_allow_html=True)
+                placeholder = st.empty()
+                with span("completion", model=choice.model, stream=True):
+                    reply = stream_completion(client, prompt, model=choice.model, max_tokens=choice.max_tokens)
+                    for _ in reply:
+                        placeholder.markdown(assistant_bubble(reply.text + " ▌"), unsafe_allow_html=True)
+                bot_reply = reply.text
+                if reply.ttft is not None:
+                    record("completion_ttft", reply.ttft, model=choice.model, cached=reply.cached)
+                st.session_state.reply_timings.append({
+                    "model": choice.model,
+                    "route_reason": choice.reason,
+                    "prompt_tokens": transcript.last_prompt_tokens,
+                    "queue_time": reply.queue_time,
+                    "ttft": reply.ttft,
+                    "duration": reply.duration,
+                    "cached": reply.cached,
+                    "coalesced": reply.coalesced
+                })
             else:
-                st.markdown(f"""
-                <div style="background: linear-gradient(135deg, #f1f3f6 0%, #e9ecef 100%); 
-                            color: #2c3e50; padding: 15px 20px; border-radius: 4px 18px 18px 18px; 
-                            margin: 10px auto 10px 0; max-width: 75%; box-shadow: 0 3px 10px rgba(0,0,0,0.1); 
-                            border-left: 4px solid #4a8cff;">
-                    {msg["content"]}
-                </div>
-                """, unsafe_allow_html=True)
+                started = time.perf_counter()
+                with span("completion", model=choice.model, stream=False):
+                    bot_reply = complete(client, prompt, model=choice.model, max_tokens=choice.max_tokens)
+                st.session_state.reply_timings.append({
+                    "model": choice.model,
+                    "route_reason": choice.reason,
+                    "prompt_tokens": transcript.last_prompt_tokens,
+                    "duration": time.perf_counter() - started
+                })
             
-        st.markdown('</div>', unsafe_allow_html=True)
-
-    # Fixed input area
-    # input_container = st.container()
-    # with input_container:
-    #     st.markdown("""
-    #     <div style="position: fixed; bottom: 20px; left: 50%; transform: translateX(-50%); 
-    #                 width: 70%; max-width: 800px; background: white; padding: 15px; 
-    #                 border-radius: 15px; box-shadow: 0 -5px 20px rgba(0,0,0,0.1); z-index: 100;">
-    #     """, unsafe_allow_html=True)
-        
-        if user_input := st.chat_input("Type your option number (1-5) or ask a question..."):
-            st.session_state.messages.append({"role": "user", "content": user_input})
-            save_message(st.session_state.uid, "user", user_input)
-            
-            try:
-                st.session_state.conversation_history.append({"role": "user", "content": user_input})
+            answer = chat_record("assistant", bot_reply)
+            save_turn(st.session_state.uid, question, answer)
+            transcript.add("assistant", bot_reply, answer["timestamp"])
+            st.session_state.pending_turn = None
+            rerun()
                 
-                completion = client.chat.completions.create(
-                    model="llama3-70b-8192",
-                    messages=st.session_state.conversation_history,
-                    temperature=0.7,
-                    max_tokens=1024
-                )
-                bot_reply = completion.choices[0].message.content
-                
-                st.session_state.messages.append({"role": "assistant", "content": bot_reply})
-                st.session_state.conversation_history.append({"role": "assistant", "content": bot_reply})
-                save_message(st.session_state.uid, "assistant", bot_reply)
-                st.rerun()
-                    
-            except Exception as e:
-                error_msg = "⚠️ Sorry, I'm having trouble responding right now. Please try again later."
-                st.session_state.messages.append({"role": "assistant", "content": error_msg})
-                st.rerun()
-        
-        st.markdown("</div>", unsafe_allow_html=True)
+        except SchedulerBusy:
+            # Shed load with a fast reply instead of queueing behind a burst
+            save_unanswered(st.session_state.uid, question)
+            transcript.add("assistant", BUSY_MESSAGE, context=False)
+            st.session_state.pending_turn = None
+            rerun()
+        except Exception as e:
+            error_msg = "⚠️ Sorry, I'm having trouble responding right now. Please try again later."
+            save_unanswered(st.session_state.uid, question)
+            transcript.add("assistant", error_msg, context=False)
+            st.session_state.pending_turn = None
+            rerun()
 
 # ----------------- Guest View ------------------
 else:
@@ -692,4 +930,21 @@ else:
             Please login or create an account to access your personalized career advisor
         </p>
     </div>
-    """, unsafe_allow_html=True)
\ No newline at end of file
+    """, unsafe_allow_html=True)
+
+# The profile read was started at login; by now the transcript is on screen
+if profile_slot is not None and st.session_state.profile is None:
+    try:
+        with span("hydrate_profile"):
+            hydration = st.session_state.hydration
+            profile = hydration.result("profile") if hydration else load_profile(st.session_state.uid)
+        st.session_state.profile = profile
+    except Exception:
+        # Show the defaults for now and read it again on the next run
+        profile = {}
+        st.session_state.hydration = None
+    with profile_slot.container():
+        render_profile(profile)
+
+# Runs that reach the end of the script close their timing span here
+end_rerun()
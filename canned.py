@@ -0,0 +1,98 @@
+import re
+from functools import lru_cache
+
+from industries import get_growing_industries
+
+# ----------------- Welcome Menu ------------------
+# Same order as the numbered list on the welcome panel in app.py
+MENU_OPTIONS = [
+    "Explore new career paths",
+    "Get job recommendations",
+    "Learn about industry trends",
+    "Resume/Interview preparation",
+    "Other career advice"
+]
+MENU_CHOICE = re.compile(r"^\s*(?:option\s*)?([1-5])\s*[.)]?\s*$", re.IGNORECASE)
+
+
+def match_menu_choice(text):
+    # Returns the 1-based option for "3", "3.", "option 3" or the option's own label
+    match = MENU_CHOICE.match(text)
+    if match:
+        return int(match.group(1))
+    normalized = text.strip().lower().rstrip(".!")
+    for number, label in enumerate(MENU_OPTIONS, start=1):
+        if normalized == label.lower():
+            return number
+    return None
+
+
+# ----------------- Templated Replies ------------------
+def _explore_paths(industries):
+    lines = [f"- {i['icon']} **{i['industry']}** ({i['growth_estimate']}): {i['description']}" for i in industries]
+    return (
+        "**🧭 Explore New Career Paths**\n\n"
+        "These industries are growing fastest right now:\n\n" + "\n".join(lines) + "\n\n"
+        "💡 Tell me about your interests, favourite subjects or current role, "
+        "and I'll suggest paths that fit you."
+    )
+
+
+def _job_recommendations(industries):
+    lines = [f"- {i['icon']} **{i['industry']}**: {', '.join(i['key_skills'][:3])}" for i in industries]
+    return (
+        "**💼 Job Recommendations**\n\n"
+        "Skills employers are hiring for in growing industries:\n\n" + "\n".join(lines) + "\n\n"
+        "💡 To recommend specific roles, tell me your education, experience and the skills you enjoy using."
+    )
+
+
+def _industry_trends(industries):
+    ranked = sorted(industries, key=lambda i: int(re.findall(r"\d+", i["growth_estimate"])[-1]), reverse=True)
+    lines = [f"{n}. {i['icon']} **{i['industry']}**: {i['growth_estimate']}" for n, i in enumerate(ranked, start=1)]
+    return (
+        "**📈 Industry Trends**\n\n"
+        "Estimated annual growth by industry:\n\n" + "\n".join(lines) + "\n\n"
+        "💡 Ask about any of these industries to learn what is driving its growth and which roles are in demand."
+    )
+
+
+def _resume_interview(industries):
+    return (
+        "**📝 Resume & Interview Preparation**\n\n"
+        "- Lead your resume with a short summary tailored to the role\n"
+        "- Describe achievements with numbers (\"cut reporting time by 30%\") rather than duties\n"
+        "- Mirror the key skills from the job posting, such as "
+        + ", ".join(industries[0]["key_skills"][:3]) + " for technology roles\n"
+        "- Prepare STAR stories (Situation, Task, Action, Result) for common interview questions\n"
+        "- Research the company and prepare two or three questions for the interviewer\n\n"
+        "💡 Paste a section of your resume or tell me the role you're interviewing for and I'll give specific feedback."
+    )
+
+
+def _other_advice(industries):
+    return (
+        "**💬 Other Career Advice**\n\n"
+        "I can help with career changes, further study, salary negotiation, work-life balance and more.\n\n"
+        "💡 What's on your mind?"
+    )
+
+
+TEMPLATES = [_explore_paths, _job_recommendations, _industry_trends, _resume_interview, _other_advice]
+
+
+@lru_cache(maxsize=None)
+def menu_reply(number):
+    # Rendered once per process; the industry data does not change between users
+    return TEMPLATES[number - 1](get_growing_industries())
+
+
+def canned_reply(text, first_turn):
+    # Menu numbers only mean a menu choice while the welcome panel is showing;
+    # later on "2" may answer a question from the advisor, so that goes to the LLM
+    if not first_turn:
+        return None
+    number = match_menu_choice(text)
+    if number is None:
+        return None
+    return menu_reply(number)
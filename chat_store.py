@@ -0,0 +1,197 @@
+import os
+import threading
+import uuid
+
+from firebase_admin import firestore
+
+from transcript_cache import utc_naive
+
+# "messages": one document per message under users/{uid}/chats (the original layout)
+# "chunks": messages packed into bounded documents under users/{uid}/conversations/{id}/chunks
+CHAT_LAYOUT = os.getenv("CHAT_LAYOUT", "messages")
+CONVERSATION_ID = os.getenv("CHAT_CONVERSATION", "main")
+# Firestore documents are capped at 1 MiB; chunks stay well below it
+CHUNK_MAX_MESSAGES = int(os.getenv("CHUNK_MAX_MESSAGES", "100"))
+CHUNK_MAX_BYTES = int(os.getenv("CHUNK_MAX_KB", "256")) * 1024
+# Ids of the chunks migrate_chunks.py packs existing history into
+LEGACY_CHUNK_PREFIX = "legacy-"
+
+
+def message_fields(record):
+    return {"role": record["role"], "content": record["content"], "timestamp": record["timestamp"]}
+
+
+def message_size(record):
+    # Content plus a rough allowance for the field names, id and timestamp
+    return len(record["content"].encode("utf-8")) + 96
+
+
+# ----------------- One Document per Message ------------------
+class MessageLayout:
+    name = "messages"
+
+    def __init__(self, db):
+        self.db = db
+
+    def chats(self, uid):
+        return self.db.collection("users").document(uid).collection("chats")
+
+    def fetch_page(self, uid, limit, before=None):
+        # The newest `limit` messages older than `before`, oldest first, and whether any older remain
+        query = self.chats(uid).order_by("timestamp", direction=firestore.Query.DESCENDING)
+        if before is not None:
+            query = query.start_after({"timestamp": before})
+        # One extra document tells us whether an older page exists
+        messages = [dict(doc.to_dict(), id=doc.id) for doc in query.limit(limit + 1).stream()]
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+        messages.reverse()
+        return messages, has_more
+
+    def fetch_newer(self, uid, after):
+        query = self.chats(uid).where(filter=firestore.FieldFilter("timestamp", ">", after)).order_by("timestamp")
+        return [dict(doc.to_dict(), id=doc.id) for doc in query.stream()]
+
+    def write(self, records):
+        # One atomic batch; each record carries its uid and document id, so replaying it is harmless
+        batch = self.db.batch()
+        for record in records:
+            batch.set(self.chats(record["uid"]).document(record["id"]), message_fields(record))
+        batch.commit()
+
+
+# ----------------- Chunked Conversations ------------------
+class ChunkLayout:
+    """Packs a conversation's messages into append-only chunk documents.
+
+    Each chunk holds up to max_messages messages or max_bytes of content, in a
+    `messages` array plus first/last timestamps for range queries. Appends use
+    ArrayUnion, so a replayed write of the same message leaves the chunk as it
+    was. Users whose history has not been migrated yet are read from the
+    per-message layout once the chunks run out.
+    """
+
+    name = "chunks"
+
+    def __init__(self, db, conversation=CONVERSATION_ID, max_messages=CHUNK_MAX_MESSAGES, max_bytes=CHUNK_MAX_BYTES):
+        self.db = db
+        self.conversation = conversation
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.legacy = MessageLayout(db)
+        self._lock = threading.Lock()
+        # uid -> (chunk id, message count, bytes) of the chunk new messages go to
+        self._heads = {}
+
+    def chunks(self, uid):
+        return (self.db.collection("users").document(uid)
+                .collection("conversations").document(self.conversation).collection("chunks"))
+
+    @staticmethod
+    def _messages(doc):
+        return [dict(m) for m in (doc.get("messages") or [])]
+
+    def _chunks_before(self, uid, before=None, batch=2):
+        # Chunks newest first, a couple per round trip, so short pages stop early
+        query = self.chunks(uid).order_by("first_timestamp", direction=firestore.Query.DESCENDING)
+        if before is not None:
+            query = query.where(filter=firestore.FieldFilter("first_timestamp", "<", before))
+        cursor = None
+        while True:
+            page = query.limit(batch)
+            if cursor is not None:
+                page = page.start_after(cursor)
+            docs = list(page.stream())
+            yield from docs
+            if len(docs) < batch:
+                return
+            cursor = docs[-1]
+
+    def fetch_page(self, uid, limit, before=None):
+        cutoff = utc_naive(before) if before is not None else None
+        seen = set()
+        messages = []
+        for doc in self._chunks_before(uid, before):
+            for m in self._messages(doc):
+                if m["id"] in seen or (cutoff is not None and utc_naive(m["timestamp"]) >= cutoff):
+                    continue
+                seen.add(m["id"])
+                messages.append(m)
+            if len(messages) > limit:
+                break
+        messages.sort(key=lambda m: utc_naive(m["timestamp"]))
+        if len(messages) <= limit:
+            # Out of chunks: anything older is still in the per-message layout (or there is nothing)
+            oldest = messages[0]["timestamp"] if messages else before
+            older, has_more = self.legacy.fetch_page(uid, limit - len(messages), oldest)
+            return [m for m in older if m["id"] not in seen] + messages, has_more
+        return messages[-limit:], True
+
+    def fetch_newer(self, uid, after):
+        cutoff = utc_naive(after)
+        query = self.chunks(uid).where(filter=firestore.FieldFilter("last_timestamp", ">", after)).order_by("last_timestamp")
+        seen = set()
+        messages = []
+        for doc in query.stream():
+            for m in self._messages(doc):
+                if m["id"] not in seen and utc_naive(m["timestamp"]) > cutoff:
+                    seen.add(m["id"])
+                    messages.append(m)
+        messages.sort(key=lambda m: utc_naive(m["timestamp"]))
+        return messages
+
+    def _head(self, uid):
+        with self._lock:
+            head = self._heads.get(uid)
+        if head is None:
+            docs = list(self.chunks(uid).order_by("last_timestamp", direction=firestore.Query.DESCENDING).limit(1).stream())
+            # Chunks written by migrate_chunks.py are never appended to, so re-running it cannot drop live messages
+            if docs and not docs[0].id.startswith(LEGACY_CHUNK_PREFIX):
+                head = (docs[0].id, docs[0].get("count") or 0, docs[0].get("bytes") or 0)
+            else:
+                head = (None, 0, 0)
+        return head
+
+    def write(self, records):
+        batch = self.db.batch()
+        heads = {}
+        appends = {}
+        for record in records:
+            uid = record["uid"]
+            chunk_id, count, size = heads.get(uid) or self._head(uid)
+            added = message_size(record)
+            if chunk_id is None or count + 1 > self.max_messages or size + added > self.max_bytes:
+                chunk_id, count, size = uuid.uuid4().hex, 0, 0
+                appends[(uid, chunk_id)] = {"new": True, "messages": []}
+            heads[uid] = (chunk_id, count + 1, size + added)
+            entry = appends.setdefault((uid, chunk_id), {"new": False, "messages": []})
+            entry["messages"].append(dict(message_fields(record), id=record["id"]))
+        for (uid, chunk_id), entry in appends.items():
+            messages = entry["messages"]
+            fields = {
+                "messages": firestore.ArrayUnion(messages),
+                "last_timestamp": max(m["timestamp"] for m in messages),
+                "count": firestore.Increment(len(messages)),
+                "bytes": firestore.Increment(sum(message_size(m) for m in messages))
+            }
+            if entry["new"]:
+                fields["first_timestamp"] = min(m["timestamp"] for m in messages)
+            batch.set(self.chunks(uid).document(chunk_id), fields, merge=True)
+        batch.commit()
+        # Only a committed batch moves the heads; a failed one is retried against the old heads
+        with self._lock:
+            self._heads.update(heads)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_chat_store(db):
+    # One store per Firestore client, so a rebuilt client (see clients.reset_clients) gets a fresh one
+    global _store
+    if _store is None or _store.db is not db:
+        with _store_lock:
+            if _store is None or _store.db is not db:
+                _store = ChunkLayout(db) if CHAT_LAYOUT == "chunks" else MessageLayout(db)
+    return _store
@@ -0,0 +1,163 @@
+import logging
+import os
+import threading
+import time
+
+import firebase_admin
+import httpx
+from firebase_admin import credentials, firestore
+from groq import DefaultHttpxClient, Groq
+
+import identity
+from timing import span
+
+logger = logging.getLogger(__name__)
+
+# Connections to the Groq API shared by every session; keep-alive ones skip the TLS handshake
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "64"))
+GROQ_MAX_KEEPALIVE = int(os.getenv("GROQ_MAX_KEEPALIVE", "32"))
+GROQ_KEEPALIVE_SECONDS = float(os.getenv("GROQ_KEEPALIVE_SECONDS", "60"))
+# A replaced Groq client is closed this long after the swap, so replies streaming through it can finish
+GROQ_RETIRE_SECONDS = float(os.getenv("GROQ_RETIRE_SECONDS", "300"))
+# CLIENT_WARMUP=0 skips opening connections before the first user needs them
+CLIENT_WARMUP = os.getenv("CLIENT_WARMUP", "1") != "0"
+
+
+# ----------------- Client Registry ------------------
+class ClientRegistry:
+    """Long-lived Groq, Firestore and identity clients, built once per process.
+
+    Each client is created on first use and then shared by every session and
+    rerun. warmup() opens the connections in the background so DNS, TLS and
+    the gRPC channel are set up before the first user turn. check() probes a
+    client with one cheap request and rebuilds the Groq client or identity
+    session when the probe fails. Firestore is only probed: firestore.client()
+    hands back the app's cached client, and its gRPC channel reconnects itself.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._health = {}
+        self.reconnects = 0
+        self.probes = {
+            "groq": lambda: self.groq().models.list(),
+            "firestore": lambda: self.firestore().collection("_health").document("ping").get(),
+            "identity": lambda: identity.get_http_session().head(identity.identity_url(), timeout=identity.IDENTITY_TIMEOUT)
+        }
+
+    def _get(self, name, build):
+        client = self._clients.get(name)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(name)
+                if client is None:
+                    client = self._clients[name] = build()
+        return client
+
+    def groq(self):
+        return self._get("groq", self._build_groq)
+
+    @staticmethod
+    def _build_groq():
+        # GROQ_BASE_URL points it at a local stand-in such as fake_groq.py
+        return Groq(
+            api_key=os.getenv("GROQ_API_KEY"),
+            base_url=os.getenv("GROQ_BASE_URL") or None,
+            http_client=DefaultHttpxClient(limits=httpx.Limits(
+                max_connections=GROQ_MAX_CONNECTIONS,
+                max_keepalive_connections=GROQ_MAX_KEEPALIVE,
+                keepalive_expiry=GROQ_KEEPALIVE_SECONDS
+            ))
+        )
+
+    def firestore(self):
+        return self._get("firestore", self._build_firestore)
+
+    @staticmethod
+    def _build_firestore():
+        if not firebase_admin._apps:
+            with span("firebase_init"):
+                firebase_admin.initialize_app(credentials.Certificate("key.json"))
+        return firestore.client()
+
+    def identity(self):
+        return identity.get_http_session()
+
+    def check(self, name):
+        # Returns True when the client answered; a failing client is rebuilt for the next caller
+        started = time.perf_counter()
+        try:
+            with span("client_check", client=name):
+                self.probes[name]()
+            ok, error = True, None
+        except Exception as e:
+            ok, error = False, f"{type(e).__name__}: {e}"
+            logger.warning("%s client failed its health check: %s", name, error)
+            self.reconnect(name)
+        with self._lock:
+            if not ok and name != "firestore":
+                self.reconnects += 1
+            self._health[name] = {
+                "ok": ok,
+                "error": error,
+                "latency": time.perf_counter() - started,
+                "checked_at": time.time()
+            }
+        return ok
+
+    def reconnect(self, name, retire_after=GROQ_RETIRE_SECONDS):
+        # New callers get a fresh client with new connections. Requests still running on the old
+        # Groq client or identity session may finish first.
+        if name == "firestore":
+            # Rebuilding would return the same cached client; its gRPC channel re-establishes itself
+            return
+        with self._lock:
+            client = self._clients.pop(name, None)
+        if name == "groq" and client is not None:
+            retire = threading.Timer(retire_after, client.close)
+            retire.daemon = True
+            retire.start()
+        elif name == "identity":
+            identity.close_http_session(after=min(retire_after, identity.IDENTITY_TIMEOUT))
+
+    def warmup(self):
+        # One probe per client, side by side, so the first user turn finds open connections
+        threads = [threading.Thread(target=self.check, args=(name,), name=f"warmup-{name}", daemon=True)
+                   for name in self.probes]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def health(self):
+        with self._lock:
+            return {"clients": dict(self._health), "reconnects": self.reconnects}
+
+    def close(self):
+        for name in self.probes:
+            self.reconnect(name, retire_after=0)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_clients():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                registry = ClientRegistry()
+                if CLIENT_WARMUP:
+                    registry.warmup()
+                _registry = registry
+    return _registry
+
+
+def reset_clients():
+    # For harnesses that point the app at new stand-ins between runs
+    global _registry
+    with _registry_lock:
+        if _registry is not None:
+            _registry.close()
+        _registry = None
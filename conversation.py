@@ -0,0 +1,165 @@
+import os
+
+from llm import complete
+from transcript_cache import utc_naive
+
+# ----------------- Prompts ------------------
+SYSTEM_PROMPT = "You are a career advisor chatbot that provides detailed, personalized advice about career paths, job recommendations, and industry trends."
+SUMMARY_PREFIX = "Summary of the earlier conversation with this user: "
+SUMMARIZE_PROMPT = (
+    "Condense the following career advice conversation into a short summary for the advisor. "
+    "Keep the user's background, goals, interests and any recommendations already given. "
+    "Write at most 150 words."
+)
+
+# Hard cap on prompt size; llama3-70b-8192 also needs room for a 1024 token reply
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+# Fold older turns once the prompt passes this many tokens, keeping the newest turns verbatim
+SUMMARY_TRIGGER_TOKENS = int(os.getenv("SUMMARY_TRIGGER_TOKENS", "4000"))
+SUMMARY_KEEP_RECENT = int(os.getenv("SUMMARY_KEEP_RECENT", "6"))
+
+
+# ----------------- Token Estimates ------------------
+def estimate_tokens(text):
+    # Roughly four characters per token for English, plus per-message framing
+    return len(text) // 4 + 4
+
+
+def make_message(role, content, timestamp=None, context=True):
+    # Token counts are measured once, when the message is created.
+    # Messages with context=False (e.g. error notices) are shown but never sent to the model.
+    return {
+        "role": role,
+        "content": content,
+        "timestamp": timestamp,
+        "tokens": estimate_tokens(content),
+        "context": context
+    }
+
+
+# ----------------- Transcript ------------------
+class Transcript:
+    """Single store for displayed messages and the model context built from them.
+
+    The prompt is the system prompt, the rolling summary and a window over the
+    newest messages. The window only moves forward, so each turn measures just
+    the messages added since the previous prompt was built.
+    """
+
+    def __init__(self, messages=(), summary=None, through=None, budget=PROMPT_TOKEN_BUDGET):
+        self.messages = [self._as_message(msg) for msg in messages]
+        self.budget = budget
+        self.system = make_message("system", SYSTEM_PROMPT)
+        self.summary = None
+        self.through = through
+        if summary:
+            self.set_summary(summary, through)
+        # Messages before `start` are covered by the summary or have fallen out of the window
+        self.start = 0
+        if through is not None:
+            self.start = next(
+                (i for i, m in enumerate(self.messages)
+                 if m.get("timestamp") and utc_naive(m["timestamp"]) > utc_naive(through)),
+                len(self.messages)
+            )
+        self._end = self.start
+        self._window_tokens = 0
+        self.last_prompt_tokens = 0
+
+    @staticmethod
+    def _as_message(msg):
+        # Stored chat documents carry no token count yet
+        if "tokens" in msg:
+            return msg
+        return make_message(msg["role"], msg["content"], msg.get("timestamp"), msg.get("context", True))
+
+    @classmethod
+    def restore(cls, messages, summary_doc=None):
+        if not summary_doc:
+            return cls(messages)
+        return cls(messages, summary_doc["content"], summary_doc.get("through"))
+
+    def prepend(self, messages):
+        # Older history loaded on request is displayed but stays out of the prompt window
+        older = [self._as_message(msg) for msg in messages]
+        self.messages[:0] = older
+        self.start += len(older)
+        self._end += len(older)
+
+    def add(self, role, content, timestamp=None, context=True):
+        msg = make_message(role, content, timestamp, context)
+        self.messages.append(msg)
+        return msg
+
+    def set_summary(self, summary, through):
+        self.summary = make_message("system", SUMMARY_PREFIX + summary)
+        self.through = through
+
+    def _extend(self):
+        while self._end < len(self.messages):
+            msg = self.messages[self._end]
+            if msg.get("context", True):
+                self._window_tokens += msg["tokens"]
+            self._end += 1
+
+    def _drop_oldest(self):
+        msg = self.messages[self.start]
+        if msg.get("context", True):
+            self._window_tokens -= msg["tokens"]
+        self.start += 1
+
+    def _fixed_tokens(self):
+        return self.system["tokens"] + (self.summary["tokens"] if self.summary else 0)
+
+    def context_tokens(self):
+        self._extend()
+        return self._fixed_tokens() + self._window_tokens
+
+    def build(self, budget=None):
+        # Newest messages that fit the budget; always keeps the latest message
+        budget = budget or self.budget
+        self._extend()
+        while self._fixed_tokens() + self._window_tokens > budget and self.start < self._end - 1:
+            self._drop_oldest()
+        prompt = [self.system]
+        if self.summary:
+            prompt.append(self.summary)
+        prompt += [m for m in self.messages[self.start:self._end] if m.get("context", True)]
+        self.last_prompt_tokens = self._fixed_tokens() + self._window_tokens
+        return prompt
+
+    # ----------------- Rolling Summary ------------------
+    def needs_summary(self, trigger=SUMMARY_TRIGGER_TOKENS):
+        return self.context_tokens() > trigger
+
+    def fold(self, client, keep_recent=SUMMARY_KEEP_RECENT):
+        """Summarizes the window except its newest turns.
+
+        Returns the summary text and the timestamp of the last folded message,
+        or (None, None) when there is nothing to fold.
+        """
+        self._extend()
+        window = [i for i in range(self.start, self._end) if self.messages[i].get("context", True)]
+        folded = window[:-keep_recent]
+        if not folded:
+            return None, None
+
+        transcript = "\n".join(f"{self.messages[i]['role']}: {self.messages[i]['content']}" for i in folded)
+        if self.summary:
+            previous = self.summary["content"][len(SUMMARY_PREFIX):]
+            transcript = f"Earlier summary: {previous}\n{transcript}"
+        summary = complete(
+            client,
+            [{"role": "system", "content": SUMMARIZE_PROMPT}, {"role": "user", "content": transcript}],
+            temperature=0.3,
+            max_tokens=300,
+            use_cache=False
+        )
+        through = next(
+            (self.messages[i].get("timestamp") for i in reversed(folded) if self.messages[i].get("timestamp")),
+            self.through
+        )
+        self.set_summary(summary, through)
+        while self.start <= folded[-1]:
+            self._drop_oldest()
+        return summary, through
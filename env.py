@@ -0,0 +1,5 @@
+from dotenv import load_dotenv
+
+# Imported first by app.py: several modules read their settings from the environment when first
+# imported. Python runs this once per process, not on every Streamlit rerun.
+load_dotenv()
@@ -0,0 +1,445 @@
+"""In-process stand-ins for Firestore, Firebase Auth and the identity REST API.
+
+Used by loadtest.py so app.py can be driven without a Firebase project:
+
+    import fake_firebase
+    store, fake_auth = fake_firebase.install(latency=0.02)
+    server, url = fake_firebase.serve_identity_in_thread(fake_auth)
+    os.environ["IDENTITY_TOOLKIT_URL"] = url
+    os.environ["SECURE_TOKEN_URL"] = url
+
+Only the parts of the client API the app uses are implemented. Every remote
+call sleeps for `latency` seconds to imitate a network round trip.
+"""
+import copy
+import datetime
+import itertools
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import urlparse
+
+_ids = itertools.count()
+
+
+def _new_id():
+    return f"{uuid.uuid4().hex[:12]}{next(_ids):08d}"
+
+
+# ----------------- Firestore ------------------
+class FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field):
+        # Like google-cloud-firestore: None for a missing document, KeyError for a missing field
+        if self._data is None:
+            return None
+        if field not in self._data:
+            raise KeyError(f"'{field}' is not contained in the data")
+        return copy.deepcopy(self._data[field])
+
+
+class FakeDocument:
+    def __init__(self, store, path):
+        self._store = store
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def collection(self, name):
+        return FakeCollection(self._store, f"{self.path}/{name}")
+
+    def get(self, transaction=None):
+        self._store.round_trip(reads=1)
+        with self._store.lock:
+            return FakeSnapshot(self, copy.deepcopy(self._store.docs.get(self.path)))
+
+    def set(self, data, merge=False):
+        self._store.round_trip(writes=1)
+        self._store.write(self.path, data, merge)
+
+    def create(self, data):
+        self._store.round_trip(writes=1)
+        with self._store.lock:
+            if self.path in self._store.docs:
+                raise FakeConflict(f"Document already exists: {self.path}")
+        self._store.write(self.path, data, False)
+
+    def update(self, data):
+        self._store.round_trip(writes=1)
+        with self._store.lock:
+            if self.path not in self._store.docs:
+                raise KeyError(self.path)
+        self._store.write(self.path, data, True)
+
+    def delete(self):
+        self._store.round_trip(writes=1)
+        with self._store.lock:
+            self._store.docs.pop(self.path, None)
+
+
+class FakeConflict(Exception):
+    pass
+
+
+class FakeQuery:
+    def __init__(self, store, path, orders=(), filters=(), limit=None, limit_to_last=False, cursor=None):
+        self._store = store
+        self._path = path
+        self._orders = list(orders)
+        self._filters = list(filters)
+        self._limit = limit
+        self._limit_to_last = limit_to_last
+        self._cursor = cursor
+
+    def _copy(self, **changes):
+        fields = dict(orders=self._orders, filters=self._filters, limit=self._limit,
+                      limit_to_last=self._limit_to_last, cursor=self._cursor)
+        fields.update(changes)
+        return FakeQuery(self._store, self._path, **fields)
+
+    def order_by(self, field, direction="ASCENDING"):
+        return self._copy(orders=self._orders + [(field, direction)])
+
+    def where(self, field=None, op=None, value=None, filter=None):
+        if filter is not None:
+            field, op, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + [(field, op, value)])
+
+    def limit(self, count):
+        return self._copy(limit=count, limit_to_last=False)
+
+    def limit_to_last(self, count):
+        return self._copy(limit=count, limit_to_last=True)
+
+    def start_after(self, values):
+        return self._copy(cursor=("after", values))
+
+    def end_before(self, values):
+        return self._copy(cursor=("before", values))
+
+    def _cursor_values(self, values):
+        if isinstance(values, FakeSnapshot):
+            values = values.to_dict()
+        if isinstance(values, dict):
+            return [values.get(field) for field, _ in self._orders]
+        return list(values)
+
+    def _matches(self, data):
+        for field, op, value in self._filters:
+            current = data.get(field)
+            if current is None:
+                return False
+            if op == "==" and not current == value:
+                return False
+            if op == ">" and not current > value:
+                return False
+            if op == ">=" and not current >= value:
+                return False
+            if op == "<" and not current < value:
+                return False
+            if op == "<=" and not current <= value:
+                return False
+            if op == "in" and current not in value:
+                return False
+        return True
+
+    def _run(self):
+        prefix = self._path + "/"
+        with self._store.lock:
+            rows = [
+                (path, copy.deepcopy(data)) for path, data in self._store.docs.items()
+                if path.startswith(prefix) and "/" not in path[len(prefix):] and self._matches(data)
+            ]
+        for field, direction in reversed(self._orders):
+            rows.sort(key=lambda row: row[1].get(field), reverse=direction in ("DESCENDING", "desc"))
+        if self._cursor:
+            kind, values = self._cursor
+            wanted = self._cursor_values(values)
+            keys = [[row[1].get(field) for field, _ in self._orders] for row in rows]
+            descending = bool(self._orders) and self._orders[0][1] in ("DESCENDING", "desc")
+            if kind == "after":
+                rows = [row for row, key in zip(rows, keys) if (key < wanted if descending else key > wanted)]
+            else:
+                rows = [row for row, key in zip(rows, keys) if (key > wanted if descending else key < wanted)]
+        if self._limit is not None:
+            rows = rows[-self._limit:] if self._limit_to_last else rows[:self._limit]
+        return [FakeSnapshot(FakeDocument(self._store, path), data) for path, data in rows]
+
+    def stream(self, transaction=None):
+        docs = self._run()
+        # Firestore bills one read per returned document (minimum one per query)
+        self._store.round_trip(reads=max(1, len(docs)))
+        return iter(docs)
+
+    def get(self, transaction=None):
+        return list(self.stream())
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self, store, path):
+        super().__init__(store, path)
+        self.id = path.rsplit("/", 1)[-1]
+
+    def document(self, document_id=None):
+        return FakeDocument(self._store, f"{self._path}/{document_id or _new_id()}")
+
+    def add(self, data, document_id=None):
+        ref = self.document(document_id)
+        ref.set(data)
+        return datetime.datetime.now(datetime.timezone.utc), ref
+
+    def list_documents(self):
+        prefix = self._path + "/"
+        with self._store.lock:
+            paths = {p[len(prefix):].split("/", 1)[0] for p in self._store.docs if p.startswith(prefix)}
+        return [self.document(doc_id) for doc_id in sorted(paths)]
+
+
+class FakeBatch:
+    def __init__(self, store):
+        self._store = store
+        self._ops = []
+
+    def set(self, reference, data, merge=False):
+        self._ops.append(("set", reference, data, merge))
+
+    def create(self, reference, data):
+        self._ops.append(("create", reference, data, False))
+
+    def update(self, reference, data):
+        self._ops.append(("set", reference, data, True))
+
+    def delete(self, reference):
+        self._ops.append(("delete", reference, None, False))
+
+    def commit(self):
+        # All writes in a batch land in one round trip, atomically
+        self._store.round_trip(writes=len(self._ops))
+        with self._store.lock:
+            for kind, reference, _, _ in self._ops:
+                if kind == "create" and reference.path in self._store.docs:
+                    raise FakeConflict(f"Document already exists: {reference.path}")
+            for kind, reference, data, merge in self._ops:
+                if kind == "delete":
+                    self._store.docs.pop(reference.path, None)
+                else:
+                    self._store.write(reference.path, data, merge)
+        self._ops = []
+        return []
+
+
+class FakeFirestore:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.lock = threading.RLock()
+        self.docs = {}
+        self.round_trips = 0
+        self.reads = 0
+        self.writes = 0
+
+    def round_trip(self, reads=0, writes=0):
+        with self.lock:
+            self.round_trips += 1
+            self.reads += reads
+            self.writes += writes
+        if self.latency:
+            time.sleep(self.latency)
+
+    def write(self, path, data, merge):
+        with self.lock:
+            current = self.docs.get(path, {}) if merge else {}
+            updated = dict(current)
+            for field, value in data.items():
+                updated[field] = self._apply(current.get(field), value)
+            self.docs[path] = updated
+
+    @staticmethod
+    def _apply(current, value):
+        # Server-side transforms used by the chunked chat layout
+        kind = type(value).__name__
+        if kind == "ArrayUnion":
+            merged = list(current or [])
+            for item in value.values:
+                if item not in merged:
+                    merged.append(copy.deepcopy(item))
+            return merged
+        if kind == "Increment":
+            return (current or 0) + value.value
+        return copy.deepcopy(value)
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def document(self, path):
+        return FakeDocument(self, path)
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def stats(self):
+        with self.lock:
+            return {"round_trips": self.round_trips, "reads": self.reads, "writes": self.writes,
+                    "documents": len(self.docs)}
+
+
+# ----------------- Auth ------------------
+class FakeAuth:
+    """Users for firebase_admin.auth and the identity REST stand-in."""
+
+    def __init__(self, latency=0.0, token_lifetime=3600):
+        self.latency = latency
+        self.token_lifetime = token_lifetime
+        self.lock = threading.Lock()
+        self.users = {}
+        self.refreshes = 0
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def add_user(self, email, password, display_name=None, uid=None):
+        user = SimpleNamespace(uid=uid or _new_id(), email=email, display_name=display_name, password=password)
+        with self.lock:
+            self.users[email] = user
+        return user
+
+    def get_user_by_email(self, email, app=None):
+        from firebase_admin import auth
+        self._wait()
+        with self.lock:
+            user = self.users.get(email)
+        if user is None:
+            raise auth.UserNotFoundError(f"No user record found for the provided email: {email}")
+        return user
+
+    def get_user(self, uid, app=None):
+        from firebase_admin import auth
+        self._wait()
+        with self.lock:
+            user = next((u for u in self.users.values() if u.uid == uid), None)
+        if user is None:
+            raise auth.UserNotFoundError(f"No user record found for the provided user ID: {uid}")
+        return user
+
+    def issue_tokens(self, user):
+        # The expiry rides in the token so verify_id_token can check it without a round trip
+        expires = int(time.time() + self.token_lifetime)
+        return f"fake-id-token.{user.uid}.{expires}", f"fake-refresh-token.{user.uid}"
+
+    def verify_id_token(self, id_token, app=None, check_revoked=False, clock_skew_seconds=0):
+        # Local like the real one: no latency, unless check_revoked asks for a user lookup
+        from firebase_admin import auth
+        parts = id_token.split(".") if isinstance(id_token, str) else []
+        if len(parts) != 3 or parts[0] != "fake-id-token":
+            raise auth.InvalidIdTokenError("Invalid ID token")
+        if int(parts[2]) + clock_skew_seconds < time.time():
+            raise auth.ExpiredIdTokenError("Token expired", None)
+        if check_revoked:
+            self.get_user(parts[1])
+        return {"uid": parts[1], "user_id": parts[1], "exp": int(parts[2])}
+
+    def create_user(self, email=None, password=None, display_name=None, uid=None, app=None, **kwargs):
+        from firebase_admin import auth
+        self._wait()
+        with self.lock:
+            if email in self.users:
+                raise auth.EmailAlreadyExistsError("The user with the provided email already exists", None, None)
+        return self.add_user(email, password, display_name, uid)
+
+
+class _IdentityHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this a kept-alive
+    # connection stalls ~40ms on Nagle plus delayed ACK
+    disable_nagle_algorithm = True
+    auth = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        path = urlparse(self.path).path
+        self.auth._wait()
+        if path.endswith("accounts:signInWithPassword"):
+            with self.auth.lock:
+                user = self.auth.users.get(body.get("email"))
+            if user is None or user.password != body.get("password"):
+                self._send_json(400, {"error": {"code": 400, "message": "INVALID_LOGIN_CREDENTIALS"}})
+                return
+            id_token, refresh_token = self.auth.issue_tokens(user)
+            self._send_json(200, {
+                "kind": "identitytoolkit#VerifyPasswordResponse",
+                "localId": user.uid,
+                "email": user.email,
+                "displayName": user.display_name or "",
+                "idToken": id_token,
+                "registered": True,
+                "refreshToken": refresh_token,
+                "expiresIn": str(self.auth.token_lifetime)
+            })
+        elif path.endswith("/v1/token"):
+            # securetoken.googleapis.com: refresh token -> new ID token
+            uid = (body.get("refresh_token") or "").rpartition(".")[2]
+            with self.auth.lock:
+                user = next((u for u in self.auth.users.values() if u.uid == uid), None)
+            if user is None or body.get("grant_type") != "refresh_token":
+                self._send_json(400, {"error": {"code": 400, "message": "INVALID_REFRESH_TOKEN"}})
+                return
+            id_token, refresh_token = self.auth.issue_tokens(user)
+            self.auth.refreshes += 1
+            self._send_json(200, {
+                "id_token": id_token,
+                "refresh_token": refresh_token,
+                "expires_in": str(self.auth.token_lifetime),
+                "token_type": "Bearer",
+                "user_id": user.uid
+            })
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": "NOT_FOUND"}})
+
+
+def serve_identity_in_thread(fake_auth, host="127.0.0.1", port=0):
+    # Returns (server, base_url) for IDENTITY_TOOLKIT_URL and SECURE_TOKEN_URL
+    handler = type("ConfiguredIdentityHandler", (_IdentityHandler,), {"auth": fake_auth})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-identity", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+# ----------------- Installation ------------------
+def install(latency=0.0):
+    """Points firebase_admin at in-memory stand-ins. Returns (firestore, auth)."""
+    import firebase_admin
+    from firebase_admin import auth, credentials, firestore
+
+    store = FakeFirestore(latency)
+    fake_auth = FakeAuth(latency)
+    credentials.Certificate = lambda *args, **kwargs: SimpleNamespace()
+    firebase_admin.initialize_app = lambda *args, **kwargs: firebase_admin._apps.setdefault("[DEFAULT]", SimpleNamespace(name="[DEFAULT]"))
+    firestore.client = lambda *args, **kwargs: store
+    auth.get_user_by_email = fake_auth.get_user_by_email
+    auth.get_user = fake_auth.get_user
+    auth.create_user = fake_auth.create_user
+    auth.verify_id_token = fake_auth.verify_id_token
+    return store, fake_auth
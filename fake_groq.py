@@ -0,0 +1,234 @@
+"""Local stand-in for the Groq chat-completions API, for load tests and benchmarks.
+
+    python fake_groq.py --port 8765 --tokens-per-second 80 --ttft 0.4 --rate-limit-rate 0.02
+    GROQ_BASE_URL=http://127.0.0.1:8765 streamlit run app.py
+
+Speaks the OpenAI/Groq protocol on /openai/v1/chat/completions, streaming (SSE)
+and non-streaming, and returns synthetic text at the configured pace.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "career skills growth industry experience role training certification network mentor "
+    "interview resume salary opportunity technology healthcare energy analysis project team "
+    "learning degree portfolio internship leadership communication market demand remote"
+).split()
+
+
+class StandInSettings:
+    def __init__(self, tokens_per_second=50.0, ttft=0.3, ttft_jitter=0.1, completion_tokens=200,
+                 error_rate=0.0, rate_limit_rate=0.0, seed=None):
+        self.tokens_per_second = tokens_per_second
+        self.ttft = ttft
+        self.ttft_jitter = ttft_jitter
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.random = random.Random(seed)
+
+
+class StandInStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.streamed = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.completion_tokens = 0
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "streamed": self.streamed,
+                "errors": self.errors,
+                "rate_limited": self.rate_limited,
+                "completion_tokens": self.completion_tokens
+            }
+
+
+def prompt_tokens(messages):
+    # Same rough estimate the app uses: four characters per token plus framing
+    return sum(len(m.get("content") or "") // 4 + 4 for m in messages)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    settings = StandInSettings()
+    stats = StandInStats()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path in ("/health", "/healthz"):
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/stats":
+            self._send_json(200, self.stats.snapshot())
+        elif self.path == "/openai/v1/models":
+            self._send_json(200, {"object": "list", "data": [
+                {"id": "llama3-70b-8192", "object": "model"},
+                {"id": "llama3-8b-8192", "object": "model"}
+            ]})
+        else:
+            self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        if self.path != "/openai/v1/chat/completions":
+            self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        settings = self.settings
+        self.stats.add(requests=1)
+
+        roll = settings.random.random()
+        if roll < settings.rate_limit_rate:
+            self.stats.add(rate_limited=1)
+            self._send_json(429, {"error": {
+                "message": "Rate limit reached for requests",
+                "type": "requests",
+                "code": "rate_limit_exceeded"
+            }}, headers={"retry-after": "1"})
+            return
+        if roll < settings.rate_limit_rate + settings.error_rate:
+            self.stats.add(errors=1)
+            self._send_json(500, {"error": {"message": "Internal server error", "type": "internal_server_error"}})
+            return
+
+        model = body.get("model", "llama3-70b-8192")
+        max_tokens = body.get("max_tokens") or body.get("max_completion_tokens") or settings.completion_tokens
+        count = min(max_tokens, settings.completion_tokens)
+        words = [settings.random.choice(WORDS) for _ in range(count)]
+        usage = {
+            "prompt_tokens": prompt_tokens(body.get("messages", [])),
+            "completion_tokens": count,
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        finish_reason = "length" if count >= max_tokens else "stop"
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        time.sleep(max(0.0, settings.ttft + settings.random.uniform(-settings.ttft_jitter, settings.ttft_jitter)))
+        self.stats.add(completion_tokens=count)
+        if not body.get("stream"):
+            # Non-streaming callers still wait for the whole generation
+            time.sleep(count / settings.tokens_per_second)
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(words)},
+                    "finish_reason": finish_reason
+                }],
+                "usage": usage
+            })
+            return
+
+        self.stats.add(streamed=1)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        def event(delta, finish=None, extra=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]
+            }
+            if extra:
+                chunk.update(extra)
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        try:
+            event({"role": "assistant", "content": ""})
+            for i, word in enumerate(words):
+                event({"content": word if i == 0 else " " + word})
+                time.sleep(1.0 / settings.tokens_per_second)
+            event({}, finish_reason, {"x_groq": {"id": completion_id, "usage": usage}})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.close_connection = True
+
+
+def make_server(host="127.0.0.1", port=8765, settings=None):
+    # Each server gets its own handler class so settings and stats are not shared
+    handler = type("ConfiguredStandInHandler", (StandInHandler,), {
+        "settings": settings or StandInSettings(),
+        "stats": StandInStats()
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve_in_thread(host="127.0.0.1", port=0, settings=None):
+    # Starts a stand-in on a background thread; port 0 picks a free port. Returns (server, base_url).
+    server = make_server(host, port, settings)
+    threading.Thread(target=server.serve_forever, name="fake-groq", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Groq-compatible chat completions stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--ttft", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--ttft-jitter", type=float, default=0.1)
+    parser.add_argument("--completion-tokens", type=int, default=200, help="tokens per reply, capped by max_tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    settings = StandInSettings(
+        tokens_per_second=args.tokens_per_second,
+        ttft=args.ttft,
+        ttft_jitter=args.ttft_jitter,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed
+    )
+    server = make_server(args.host, args.port, settings)
+    print(f"Groq stand-in listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from industries import get_growing_industries, industry_overview
+from semantic_cache import first_turn_question, hashed_counts, tokenize
+
+ANSWER_STORE_PATH = os.getenv("ANSWER_STORE_PATH", os.path.join(os.getenv("RESPONSE_CACHE_DIR", ".cache"), "answers.sqlite3"))
+FAQ_MATCH_THRESHOLD = float(os.getenv("FAQ_MATCH_THRESHOLD", "0.7"))
+
+# ----------------- Question Templates ------------------
+# The follow-ups users ask about every industry; {industry} is filled in per industry
+FAQ_TEMPLATES = [
+    "What careers in {industry} are in demand and how can I get started?",
+    "What entry-level jobs are available in {industry}?",
+    "What skills do I need for a career in {industry}?",
+    "What degrees or certifications are useful for {industry}?",
+    "What salaries can I expect in {industry}?",
+    "How can I switch into a {industry} career from another field?",
+    "What does the future of {industry} jobs look like?"
+]
+
+
+def mentions_industry(industry, text):
+    # "e-commerce"/"ecommerce", "cyber security" and synonyms such as "tech" or "health" all count
+    compact = re.sub(r"[^a-z0-9]", "", text.lower())
+    if re.sub(r"[^a-z0-9]", "", industry.lower()) in compact:
+        return True
+    return max(tokenize(industry), key=len) in tokenize(text)
+
+
+def answer_key(question, model, system_prompt):
+    # Content hash of everything that shapes the answer, so changed prompts are regenerated
+    return hashlib.sha256(f"{model}\n{system_prompt}\n{question}".encode("utf-8")).hexdigest()
+
+
+# ----------------- Answer Store ------------------
+class AnswerStore:
+    """Local SQLite store of pre-generated answers, written by faq_batch.py and read by the app."""
+
+    def __init__(self, path=ANSWER_STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS answers (
+                    key TEXT PRIMARY KEY,
+                    industry TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    answer TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+        self._lock = threading.Lock()
+        self._index_mtime = None
+        self._industries = np.array([])
+        self._questions = []
+        self._answers = []
+        self._matrix = None
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def has(self, key):
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM answers WHERE key = ?", (key,)).fetchone() is not None
+
+    def put(self, key, industry, question, answer, model):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO answers (key, industry, question, answer, model, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, industry, question, answer, model, time.time())
+            )
+
+    def count(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+    def _refresh(self):
+        # Rebuild the in-memory index whenever the batch job has written new answers
+        try:
+            mtime = max(os.path.getmtime(p) for p in (self.path, self.path + "-wal") if os.path.exists(p))
+        except ValueError:
+            return
+        if mtime == self._index_mtime:
+            return
+        with self._connect() as conn:
+            rows = conn.execute("SELECT industry, question, answer FROM answers").fetchall()
+        self._industries = np.array([r[0] for r in rows])
+        self._questions = [r[1] for r in rows]
+        self._answers = [r[2] for r in rows]
+        if rows:
+            matrix = np.stack([hashed_counts(q, 4096) for q in self._questions])
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            self._matrix = matrix / norms
+        else:
+            self._matrix = None
+        self._index_mtime = mtime
+
+    def lookup(self, text, threshold=FAQ_MATCH_THRESHOLD, industry=None):
+        # industry limits the answers considered to that industry's
+        query = hashed_counts(text, 4096)
+        norm = np.linalg.norm(query)
+        with self._lock:
+            self._refresh()
+            if self._matrix is None or not norm:
+                self.misses += 1
+                return None
+            scores = self._matrix @ (query / norm)
+            # Questions about one industry look alike, so only answers for a named industry qualify
+            for name in set(self._industries.tolist()):
+                if not mentions_industry(name, text) or industry not in (None, name):
+                    scores[self._industries == name] = -1.0
+            best = int(np.argmax(scores))
+            # A qualifier the stored question lacks ("... if I am colorblind") needs its own answer
+            extra = set(tokenize(text)) - set(tokenize(self._questions[best]))
+            if scores[best] < threshold or extra:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._answers[best]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_answer_store():
+    # Returns None until faq_batch.py has produced a store
+    global _store
+    if _store is None:
+        if not os.path.exists(ANSWER_STORE_PATH):
+            return None
+        with _store_lock:
+            if _store is None:
+                _store = AnswerStore()
+    return _store
+
+
+def faq_answer(text, industry=None):
+    store = get_answer_store()
+    return store.lookup(text, industry=industry) if store else None
+
+
+def card_industry(messages):
+    # The industry whose card overview is the only thing said before the latest question, if any
+    if [m["role"] for m in messages] != ["system", "assistant", "user"]:
+        return None
+    for industry in get_growing_industries():
+        if messages[1]["content"] == industry_overview(industry):
+            return industry["industry"]
+    return None
+
+
+def stored_reply(text, messages):
+    # Stored answers were written without any conversation, so they only answer an opening question
+    # or a follow-up to a just-opened card (static text), and then only about that card's industry
+    if first_turn_question(messages):
+        return faq_answer(text)
+    industry = card_industry(messages)
+    return faq_answer(text, industry) if industry else None
@@ -0,0 +1,91 @@
+"""Pre-generate answers to common industry questions into the local answer store.
+
+Run it off-peak, e.g.:
+
+    python faq_batch.py --workers 4
+    python faq_batch.py --templates questions.txt --model llama3-70b-8192
+
+Answers are keyed by a content hash of model, system prompt and question, so an
+interrupted run picks up where it stopped and only changed questions are redone.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+from groq import Groq
+
+from conversation import SYSTEM_PROMPT
+from faq import FAQ_TEMPLATES, AnswerStore, answer_key
+from industries import get_growing_industries
+from llm import DEFAULT_MODEL, DEFAULT_TEMPERATURE, DEFAULT_MAX_TOKENS
+
+
+def load_templates(path):
+    if not path:
+        return FAQ_TEMPLATES
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def generate(client, question, model, retries=3):
+    for attempt in range(retries):
+        try:
+            completion = client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": question}
+                ],
+                temperature=DEFAULT_TEMPERATURE,
+                max_tokens=DEFAULT_MAX_TOKENS
+            )
+            return completion.choices[0].message.content
+        except Exception:
+            if attempt == retries - 1:
+                raise
+            # Back off on rate limits and transient errors
+            time.sleep(2 ** attempt)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate industry FAQ answers")
+    parser.add_argument("--templates", help="file with one question template per line, using {industry}")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--workers", type=int, default=4, help="concurrent completions")
+    parser.add_argument("--store", help="answer store path (defaults to ANSWER_STORE_PATH)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+    store = AnswerStore(args.store) if args.store else AnswerStore()
+
+    jobs = []
+    for industry in get_growing_industries():
+        for template in load_templates(args.templates):
+            question = template.format(industry=industry["industry"])
+            key = answer_key(question, args.model, SYSTEM_PROMPT)
+            if store.has(key):
+                continue
+            jobs.append((key, industry["industry"], question))
+    print(f"{len(jobs)} answers to generate, {store.count()} already stored")
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(generate, client, question, args.model): (key, industry, question)
+                   for key, industry, question in jobs}
+        for future in as_completed(futures):
+            key, industry, question = futures[future]
+            try:
+                store.put(key, industry, question, future.result(), args.model)
+                print(f"✓ {question}")
+            except Exception as e:
+                failed += 1
+                print(f"✗ {question}: {e}")
+
+    print(f"Done: {len(jobs) - failed} generated, {failed} failed, {store.count()} stored")
+
+
+if __name__ == "__main__":
+    main()
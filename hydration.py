@@ -0,0 +1,42 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from timing import attributed
+
+# Post-login reads run side by side on a small pool shared by every session
+HYDRATION_WORKERS = int(os.getenv("HYDRATION_WORKERS", "6"))
+HYDRATION_TIMEOUT = float(os.getenv("HYDRATION_TIMEOUT", "10"))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hydration_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=HYDRATION_WORKERS, thread_name_prefix="hydrate")
+    return _pool
+
+
+class Hydration:
+    """The reads one login needs, started together so they overlap.
+
+    Each task is a plain function run on the shared pool; it must not touch
+    st.session_state, which only the script thread may use. Spans a task
+    records are attributed to the session and rerun that started it. Callers
+    wait on just what they are about to render.
+    """
+
+    def __init__(self, tasks):
+        pool = get_hydration_pool()
+        self.futures = {name: pool.submit(attributed(task)) for name, task in tasks.items()}
+
+    def done(self, name):
+        return self.futures[name].done()
+
+    def result(self, name, timeout=HYDRATION_TIMEOUT):
+        # Re-raises the task's exception, or TimeoutError
+        return self.futures[name].result(timeout)
@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Keep-alive connections to the identity endpoints, shared by every session in the process
+IDENTITY_POOL_SIZE = int(os.getenv("IDENTITY_POOL_SIZE", "10"))
+IDENTITY_TIMEOUT = float(os.getenv("IDENTITY_TIMEOUT", "10"))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def identity_url():
+    # IDENTITY_TOOLKIT_URL points logins at a local stand-in during load tests
+    return os.getenv("IDENTITY_TOOLKIT_URL", "https://identitytoolkit.googleapis.com")
+
+
+def secure_token_url():
+    return os.getenv("SECURE_TOKEN_URL", "https://securetoken.googleapis.com")
+
+
+def get_http_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=IDENTITY_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def close_http_session(after=0):
+    # The next get_http_session() opens a fresh pool; requests in flight on the old one get `after` seconds
+    global _session
+    with _session_lock:
+        session, _session = _session, None
+    if session is None:
+        return
+    if after:
+        timer = threading.Timer(after, session.close)
+        timer.daemon = True
+        timer.start()
+    else:
+        session.close()
+
+
+def post_json(url, payload):
+    """POSTs on the pooled session. Returns the decoded body and per-phase timings in seconds.
+
+    `response` is the time until the response headers arrived, `body` the time to
+    read and decode the body, and `reused` whether an idle keep-alive connection
+    was used instead of a new connection and TLS handshake.
+    """
+    started = time.perf_counter()
+    # Streamed so the headers and the body can be timed apart
+    response = get_http_session().post(url, json=payload, timeout=IDENTITY_TIMEOUT, stream=True)
+    received = time.perf_counter()
+    conn = response.raw.connection
+    reused = getattr(conn, "identity_reused", False)
+    if conn is not None:
+        conn.identity_reused = True
+    with response:
+        result = response.json()
+    finished = time.perf_counter()
+    timings = {
+        "response": received - started,
+        "body": finished - received,
+        "total": finished - started,
+        "reused": reused
+    }
+    return result, timings
+
+
+def sign_in(email, password, api_key):
+    # The response already carries localId and displayName, so no Admin SDK lookup follows
+    url = f"{identity_url()}/v1/accounts:signInWithPassword?key={api_key}"
+    return post_json(url, {"email": email, "password": password, "returnSecureToken": True})
+
+
+def refresh_id_token(refresh_token, api_key):
+    # Trades a refresh token for a new ID token (id_token, refresh_token, expires_in, user_id)
+    url = f"{secure_token_url()}/v1/token?key={api_key}"
+    return post_json(url, {"grant_type": "refresh_token", "refresh_token": refresh_token})
@@ -0,0 +1,64 @@
+# ----------------- Industry Data ------------------
+def get_growing_industries():
+    return [
+        {
+            "industry": "Technology", 
+            "growth_estimate": "5-10% annually", 
+            "icon": "💻", 
+            "description": "The technology sector continues to expand with innovations in AI, cloud computing, and cybersecurity. Careers in software development, data science, and IT infrastructure are in high demand worldwide.",
+            "key_skills": ["Python/Java", "Machine Learning", "Cloud Architecture", "Cybersecurity", "Agile Methodologies"],
+            "subjects": ["Computer Science", "Data Structures", "Algorithms", "Mathematics", "Statistics"]
+        },
+        {
+            "industry": "Healthcare", 
+            "growth_estimate": "7-12% annually", 
+            "icon": "🏥", 
+            "description": "Healthcare is experiencing rapid growth due to aging populations and medical advancements. Opportunities abound in nursing, medical technology, healthcare administration, and specialized medicine.",
+            "key_skills": ["Patient Care", "Medical Knowledge", "Technical Skills", "Communication", "Problem Solving"],
+            "subjects": ["Biology", "Chemistry", "Anatomy", "Nursing", "Public Health"]
+        },
+        {
+            "industry": "Renewable Energy", 
+            "growth_estimate": "8-15% annually", 
+            "icon": "🌱", 
+            "description": "The shift toward sustainable energy solutions is creating jobs in solar/wind technology, energy storage, and green infrastructure development.",
+            "key_skills": ["Engineering", "Project Management", "Technical Design", "Environmental Regulations", "Data Analysis"],
+            "subjects": ["Environmental Science", "Engineering", "Physics", "Chemistry", "Sustainability"]
+        },
+        {
+            "industry": "E-commerce", 
+            "growth_estimate": "10-20% annually", 
+            "icon": "🛒", 
+            "description": "Online retail continues to transform the shopping experience, driving demand for digital marketing specialists, logistics coordinators, and UX designers.",
+            "key_skills": ["Digital Marketing", "Data Analytics", "Supply Chain Management", "Customer Service", "UI/UX Design"],
+            "subjects": ["Business", "Marketing", "Computer Science", "Statistics", "Graphic Design"]
+        },
+        {
+            "industry": "Cybersecurity", 
+            "growth_estimate": "15-25% annually", 
+            "icon": "🔒", 
+            "description": "With increasing digital threats, cybersecurity professionals are needed across all sectors to protect data and infrastructure.",
+            "key_skills": ["Network Security", "Ethical Hacking", "Risk Assessment", "Cryptography", "Incident Response"],
+            "subjects": ["Computer Science", "Information Technology", "Mathematics", "Network Engineering", "Criminal Justice"]
+        }
+    ]
+
+
+def industry_overview(industry):
+    # Static overview shown when an industry card is opened
+    return f"""
+    **{industry['icon']} {industry['industry']} Career Overview**  
+    
+    📈 **Growth Projection:** {industry['growth_estimate']}  
+    
+    🛠️ **Key Skills in Demand:**  
+    {', '.join(industry['key_skills'])}  
+    
+    📚 **Relevant Education:**  
+    {', '.join(industry['subjects'])}  
+    
+    ℹ️ **Industry Insight:**  
+    {industry['description']}  
+    
+    💡 **Career Advice:** What specific aspect of {industry['industry']} careers would you like to explore?
+    """
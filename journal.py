@@ -0,0 +1,351 @@
+import collections
+import datetime
+import json
+import os
+import random
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Chat messages are appended here first and written to Firestore in the background;
+# CHAT_JOURNAL=0 writes each turn to Firestore directly instead
+CHAT_JOURNAL_ENABLED = os.getenv("CHAT_JOURNAL", "1") != "0"
+JOURNAL_FLUSH_SECONDS = float(os.getenv("JOURNAL_FLUSH_SECONDS", "0.2"))
+# Firestore accepts at most 500 writes per batch
+JOURNAL_BATCH_SIZE = int(os.getenv("JOURNAL_BATCH_SIZE", "200"))
+# fsync every append so an acknowledged message survives a crash (JOURNAL_FSYNC=0 trades that for speed)
+JOURNAL_FSYNC = os.getenv("JOURNAL_FSYNC", "1") != "0"
+# The journal is truncated once everything in it has been flushed and it has grown past this size
+JOURNAL_COMPACT_BYTES = int(float(os.getenv("JOURNAL_COMPACT_MB", "8")) * 1024 * 1024)
+# Failed attempts before a write that keeps being rejected is set aside in <journal>.failed;
+# outages (unavailable, timeouts, rate limits) are retried without limit
+JOURNAL_MAX_ATTEMPTS = int(os.getenv("JOURNAL_MAX_ATTEMPTS", "8"))
+
+
+def journal_path():
+    # Read when the journal is built, so harnesses can point it elsewhere after importing this module
+    return os.getenv("JOURNAL_PATH", os.path.join(os.getenv("RESPONSE_CACHE_DIR", ".cache"), "chat_journal.jsonl"))
+
+
+def _try_lock(f):
+    try:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def claim_slot(base, slots=64):
+    """Locks the first journal file no other process on the host holds.
+
+    Returns (path, lock file). Every server process gets its own file, sequence
+    numbers and checkpoint; a restarted process reclaims a free slot and
+    replays what its predecessor left unflushed.
+    """
+    root, ext = os.path.splitext(base)
+    os.makedirs(os.path.dirname(base) or ".", exist_ok=True)
+    for n in range(slots):
+        path = base if n == 0 else f"{root}.{n}{ext}"
+        lock = open(path + ".lock", "a+")
+        if _try_lock(lock):
+            return path, lock
+        lock.close()
+    raise RuntimeError(f"all {slots} journal slots next to {base} are in use")
+
+
+def is_transient(error):
+    # Errors worth retrying forever: the store is away, not rejecting this write
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    try:
+        from google.api_core import exceptions
+    except ImportError:
+        return False
+    return isinstance(error, (exceptions.ServiceUnavailable, exceptions.DeadlineExceeded, exceptions.InternalServerError,
+                              exceptions.TooManyRequests, exceptions.Aborted, exceptions.ResourceExhausted))
+
+
+def _encode(entry):
+    entry = dict(entry)
+    if isinstance(entry.get("timestamp"), datetime.datetime):
+        entry["timestamp"] = entry["timestamp"].isoformat()
+    return json.dumps(entry, ensure_ascii=False)
+
+
+def _decode(line):
+    entry = json.loads(line)
+    if entry.get("timestamp"):
+        entry["timestamp"] = datetime.datetime.fromisoformat(entry["timestamp"])
+    return entry
+
+
+# ----------------- Write-behind Journal ------------------
+class ChatJournal:
+    """Durable write-behind queue between the chat UI and Firestore.
+
+    append() writes entries to a local append-only file and returns; a flusher
+    thread hands them to `writer` in batches, retrying with backoff until they
+    are stored. A checkpoint file records the last flushed sequence number, so
+    entries still unflushed at a crash are replayed on the next start. Replays
+    are idempotent because every entry carries its own Firestore document id.
+
+    A batch rejected max_attempts times is retried one entry at a time, and an
+    entry that still fails is moved to <path>.failed so it cannot hold up
+    everyone else's writes.
+    """
+
+    def __init__(self, writer, path=None, flush_interval=JOURNAL_FLUSH_SECONDS,
+                 batch_size=JOURNAL_BATCH_SIZE, fsync=JOURNAL_FSYNC, compact_bytes=JOURNAL_COMPACT_BYTES,
+                 max_backoff=30.0, max_attempts=JOURNAL_MAX_ATTEMPTS):
+        self.writer = writer
+        self.path, self._slot_lock = claim_slot(path or journal_path())
+        path = self.path
+        self.checkpoint_path = path + ".checkpoint"
+        self.failed_path = path + ".failed"
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.compact_bytes = compact_bytes
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        # Entries up to this seq are flushed one by one to find the one being rejected
+        self._isolate_through = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._pending = collections.deque()
+        self._recent = collections.deque()
+        self.appended = 0
+        self.flushed = 0
+        self.batches = 0
+        self.failures = 0
+        self.replayed = 0
+        self.set_aside = 0
+        self.last_error = None
+        self._closed = False
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._checkpoint = self._read_checkpoint()
+        self._seq = self._checkpoint
+        self._recover()
+        self._file = open(path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._run, name="chat-journal", daemon=True)
+        self._thread.start()
+
+    def _read_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _write_checkpoint(self, seq):
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(str(seq))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_path)
+
+    def _recover(self):
+        # Everything after the checkpoint was acknowledged but may never have reached Firestore
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = _decode(line)
+                except ValueError:
+                    # A torn final line from a crash mid-append was never acknowledged
+                    continue
+                self._seq = max(self._seq, entry["seq"])
+                if entry["seq"] > self._checkpoint:
+                    entry["appended_at"] = time.time()
+                    self._pending.append(entry)
+        self.replayed = len(self._pending)
+
+    def append(self, entries):
+        # Durable once this returns; Firestore catches up in the background
+        with self._lock:
+            lines = []
+            for entry in entries:
+                self._seq += 1
+                entry = dict(entry, seq=self._seq)
+                lines.append(_encode(entry) + "\n")
+                entry["appended_at"] = time.time()
+                self._pending.append(entry)
+            self._file.write("".join(lines))
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self.appended += len(lines)
+            self._wake.notify()
+
+    def pending(self, uid):
+        # Messages for one user that Firestore does not have yet, so reads can include them
+        with self._lock:
+            return [{k: v for k, v in e.items() if k not in ("seq", "appended_at")}
+                    for e in self._pending if e.get("uid") == uid]
+
+    def _take_batch(self):
+        with self._lock:
+            while not self._pending and not self._closed:
+                self._wake.wait(self.flush_interval)
+            if self._closed:
+                return None
+            if self._pending[0]["seq"] <= self._isolate_through:
+                return [self._pending[0]]
+            return list(self._pending)[:self.batch_size]
+
+    def _set_aside(self, entry, error):
+        # Kept for inspection and manual replay; it no longer blocks the journal
+        with open(self.failed_path, "a", encoding="utf-8") as f:
+            f.write(_encode(dict({k: v for k, v in entry.items() if k != "appended_at"}, error=error)) + "\n")
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+    def _run(self):
+        backoff = self.flush_interval or 0.1
+        attempts = 0
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            started = time.perf_counter()
+            try:
+                self.writer(batch)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                with self._lock:
+                    self.failures += 1
+                    self.last_error = error
+                if not is_transient(e):
+                    attempts += 1
+                if attempts < self.max_attempts:
+                    # Keep the batch and try again later; nothing is dropped while Firestore is away
+                    time.sleep(backoff * random.uniform(0.5, 1.0))
+                    backoff = min(backoff * 2, self.max_backoff)
+                    continue
+                attempts = 0
+                backoff = self.flush_interval or 0.1
+                if len(batch) > 1:
+                    # Find the entry being rejected by writing this batch's entries one at a time
+                    with self._lock:
+                        self._isolate_through = batch[-1]["seq"]
+                    continue
+                self._set_aside(batch[0], error)
+                stored = False
+            else:
+                attempts = 0
+                backoff = self.flush_interval or 0.1
+                stored = True
+            with self._lock:
+                if self._closed:
+                    # The file is gone; the checkpoint was not advanced, so the batch is replayed next start
+                    return
+                for _ in batch:
+                    self._pending.popleft()
+                if stored:
+                    self.flushed += len(batch)
+                    self.batches += 1
+                    self.last_error = None
+                    now = time.time()
+                    self._recent.append((now, len(batch), time.perf_counter() - started))
+                    while self._recent and self._recent[0][0] < now - 60:
+                        self._recent.popleft()
+                else:
+                    self.set_aside += 1
+                self._checkpoint = batch[-1]["seq"]
+                checkpoint = self._checkpoint
+                compact = not self._pending and self._file.tell() > self.compact_bytes
+            self._write_checkpoint(checkpoint)
+            if compact:
+                self._compact()
+            if len(batch) < self.batch_size and self.flush_interval:
+                # Let the next batch gather instead of committing every message on its own
+                time.sleep(self.flush_interval)
+
+    def _compact(self):
+        with self._lock:
+            # Appends may have arrived meanwhile; only an empty backlog can be discarded
+            if self._pending:
+                return
+            self._file.close()
+            self._file = open(self.path, "w", encoding="utf-8")
+
+    def stats(self):
+        with self._lock:
+            now = time.time()
+            window = [(t, n, d) for t, n, d in self._recent if t >= now - 60]
+            flushed_recent = sum(n for _, n, _ in window)
+            return {
+                "pending": len(self._pending),
+                "lag_seconds": now - self._pending[0]["appended_at"] if self._pending else 0.0,
+                "appended": self.appended,
+                "flushed": self.flushed,
+                "batches": self.batches,
+                "replayed": self.replayed,
+                "set_aside": self.set_aside,
+                "failures": self.failures,
+                "last_error": self.last_error,
+                "flushed_per_second": flushed_recent / 60.0,
+                "mean_batch_seconds": sum(d for _, _, d in window) / len(window) if window else None
+            }
+
+    def drain(self, timeout=10):
+        # Waits until everything appended so far is in Firestore; returns False on timeout
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if not self._pending:
+                    return True
+            time.sleep(0.05)
+        return False
+
+    def close(self, timeout=5):
+        # Flushes what it can within timeout, then stops the flusher and frees the journal file for the next owner
+        self.drain(timeout)
+        with self._lock:
+            self._closed = True
+            self._wake.notify()
+        self._thread.join(timeout)
+        with self._lock:
+            self._file.close()
+        self._slot_lock.close()
+
+
+_journal = None
+_journal_target = None
+_journal_lock = threading.Lock()
+
+
+def get_journal(writer, target=None):
+    """Returns the process's journal, or None when CHAT_JOURNAL=0.
+
+    The first caller's writer is used for as long as `target` (the client the
+    writer stores to) stays the same; a new target closes the old journal and
+    builds another, as when a load test starts over against a new stand-in.
+    """
+    global _journal, _journal_target
+    if not CHAT_JOURNAL_ENABLED:
+        return None
+    if _journal is None or _journal_target is not target:
+        with _journal_lock:
+            if _journal is None or _journal_target is not target:
+                if _journal is not None:
+                    _journal.close()
+                _journal = ChatJournal(writer)
+                _journal_target = target
+    return _journal
+
+
+def journal_stats():
+    return _journal.stats() if _journal else None
@@ -0,0 +1,292 @@
+import queue
+import threading
+import time
+
+from scheduler import get_scheduler, INTERACTIVE, SchedulerBusy
+from singleflight import SingleFlight, fingerprint
+from response_cache import get_response_cache, cache_key
+from semantic_cache import get_semantic_cache
+from request_log import log_request
+
+# ----------------- Model Defaults ------------------
+DEFAULT_MODEL = "llama3-70b-8192"
+DEFAULT_TEMPERATURE = 0.7
+DEFAULT_MAX_TOKENS = 1024
+
+_DONE = object()
+
+
+def api_messages(messages):
+    # Chat messages may carry bookkeeping such as timestamps; the API only takes role and content
+    return [{"role": m["role"], "content": m["content"]} for m in messages]
+
+
+# ----------------- Reply Caches ------------------
+def _cached_reply(key, messages, params):
+    # Exact matches first, then paraphrases of an opening question
+    cache = get_response_cache()
+    if cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    semantic = get_semantic_cache()
+    if semantic:
+        return semantic.lookup(messages, params)
+    return None
+
+
+def _store_reply(key, messages, params, text):
+    cache = get_response_cache()
+    if cache:
+        cache.put(key, text)
+    semantic = get_semantic_cache()
+    if semantic:
+        semantic.store(messages, text, params)
+
+
+# ----------------- Streaming Replies ------------------
+class StreamedReply:
+    """Yields text deltas produced by a generation worker and times the first token."""
+
+    def __init__(self, started_at=None):
+        self.started_at = started_at or time.perf_counter()
+        self.dequeued_at = None
+        self.first_token_at = None
+        self.finished_at = None
+        self.text = ""
+        self.cached = False
+        self.coalesced = False
+        self._deltas = queue.Queue()
+
+    @classmethod
+    def from_text(cls, text):
+        # A reply that is already complete, e.g. served from a cache
+        reply = cls()
+        reply.dequeued_at = reply.started_at
+        reply.cached = True
+        reply._deltas.put(text)
+        reply._deltas.put(_DONE)
+        return reply
+
+    def __iter__(self):
+        try:
+            while True:
+                delta = self._deltas.get()
+                if delta is _DONE:
+                    break
+                if isinstance(delta, Exception):
+                    raise delta
+                if self.first_token_at is None:
+                    self.first_token_at = time.perf_counter()
+                self.text += delta
+                yield delta
+        finally:
+            self.finished_at = time.perf_counter()
+
+    @property
+    def ttft(self):
+        # Seconds from request start until the first token arrived
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def queue_time(self):
+        if self.dequeued_at is None:
+            return None
+        return self.dequeued_at - self.started_at
+
+    @property
+    def duration(self):
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+
+class _Broadcast:
+    """Fans the deltas of one upstream stream out to every reply waiting on it.
+
+    Late subscribers first receive everything produced so far, so a Streamlit
+    rerun can rejoin a generation that is already under way.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._parts = []
+        self._replies = []
+        self._end = None
+
+    def subscribe(self, reply):
+        with self._lock:
+            for part in self._parts:
+                reply._deltas.put(part)
+            if self._end is not None:
+                for item in self._end:
+                    reply._deltas.put(item)
+            else:
+                self._replies.append(reply)
+
+    def publish(self, delta):
+        with self._lock:
+            self._parts.append(delta)
+            for reply in self._replies:
+                reply._deltas.put(delta)
+
+    def close(self, error=None):
+        with self._lock:
+            self._end = (error, _DONE) if error else (_DONE,)
+            for reply in self._replies:
+                for item in self._end:
+                    reply._deltas.put(item)
+            self._replies = []
+
+
+# Identical in-flight prompts share one upstream call, across all sessions in the process
+_flights = SingleFlight()
+
+
+def stream_completion(client, messages, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE,
+                      max_tokens=DEFAULT_MAX_TOKENS, priority=INTERACTIVE, use_cache=True):
+    # Raises SchedulerBusy straight away when the generation queue is too deep
+    messages = api_messages(messages)
+    started_at = time.time()
+    key = cache_key(messages, model, temperature, max_tokens)
+    if use_cache:
+        cached = _cached_reply(key, messages, (model, temperature, max_tokens))
+        if cached is not None:
+            log_request("stream", model, messages, max_tokens, temperature, started_at, time.time() - started_at,
+                        status="cached", response=cached, priority=priority)
+            return StreamedReply.from_text(cached)
+
+    reply = StreamedReply()
+    flight_key = fingerprint(messages, model=model, temperature=temperature, max_tokens=max_tokens, stream=True)
+    broadcast, leader = _flights.share(flight_key, _Broadcast)
+    broadcast.subscribe(reply)
+    if not leader:
+        reply.coalesced = True
+        log_request("stream", model, messages, max_tokens, temperature, started_at, 0.0,
+                    status="coalesced", priority=priority)
+        return reply
+
+    def generate():
+        # Runs on a generation worker and always reads the stream to the end,
+        # so the result is cached even if the reader went away mid-reply
+        reply.dequeued_at = time.perf_counter()
+        parts = []
+        first_token_at = None
+        usage = None
+        try:
+            stream = client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
+            )
+            for chunk in stream:
+                x_groq = getattr(chunk, "x_groq", None)
+                usage = getattr(x_groq, "usage", None) or getattr(chunk, "usage", None) or usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                if delta:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    parts.append(delta)
+                    broadcast.publish(delta)
+        except Exception as e:
+            broadcast.close(e)
+            log_request("stream", model, messages, max_tokens, temperature, started_at,
+                        time.perf_counter() - reply.started_at, status="error", queue_time=reply.queue_time,
+                        error=e, priority=priority)
+        else:
+            text = "".join(parts)
+            if text and use_cache:
+                _store_reply(key, messages, (model, temperature, max_tokens), text)
+            broadcast.close()
+            log_request("stream", model, messages, max_tokens, temperature, started_at,
+                        time.perf_counter() - reply.started_at, queue_time=reply.queue_time,
+                        ttft=first_token_at - reply.started_at if first_token_at else None,
+                        usage=usage, response=text, priority=priority)
+        finally:
+            _flights.forget(flight_key, broadcast)
+
+    try:
+        get_scheduler().submit(generate, priority=priority)
+    except SchedulerBusy:
+        broadcast.close(SchedulerBusy("generation queue is full"))
+        _flights.forget(flight_key, broadcast)
+        log_request("stream", model, messages, max_tokens, temperature, started_at, time.time() - started_at,
+                    status="busy", priority=priority)
+        raise
+    return reply
+
+
+def complete(client, messages, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE,
+             max_tokens=DEFAULT_MAX_TOKENS, priority=INTERACTIVE, use_cache=True):
+    messages = api_messages(messages)
+    started_at = time.time()
+    key = cache_key(messages, model, temperature, max_tokens)
+    if use_cache:
+        cached = _cached_reply(key, messages, (model, temperature, max_tokens))
+        if cached is not None:
+            log_request("complete", model, messages, max_tokens, temperature, started_at, time.time() - started_at,
+                        status="cached", response=cached, priority=priority)
+            return cached
+
+    def generate():
+        future = _submit(client, messages, model, temperature, max_tokens, priority, "complete")
+        text = future.result().choices[0].message.content
+        if text and use_cache:
+            _store_reply(key, messages, (model, temperature, max_tokens), text)
+        return text
+
+    flight_key = fingerprint(messages, model=model, temperature=temperature, max_tokens=max_tokens)
+    return _flights.do(flight_key, generate)
+
+
+def _submit(client, messages, model, temperature, max_tokens, priority, kind):
+    # Queues a non-streaming call and logs it once it finishes
+    started_at = time.time()
+    started = time.perf_counter()
+    try:
+        future = get_scheduler().submit(
+            client.chat.completions.create,
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            priority=priority
+        )
+    except SchedulerBusy:
+        log_request(kind, model, messages, max_tokens, temperature, started_at, time.perf_counter() - started,
+                    status="busy", priority=priority)
+        raise
+
+    def finished(future):
+        if future.cancelled():
+            return
+        latency = time.perf_counter() - started
+        queue_time = getattr(future, "queue_time", None)
+        error = future.exception()
+        if error is not None:
+            log_request(kind, model, messages, max_tokens, temperature, started_at, latency, status="error",
+                        queue_time=queue_time, error=error, priority=priority)
+            return
+        completion = future.result()
+        log_request(kind, model, messages, max_tokens, temperature, started_at, latency, queue_time=queue_time,
+                    usage=getattr(completion, "usage", None), response=completion.choices[0].message.content,
+                    priority=priority)
+
+    future.add_done_callback(finished)
+    return future
+
+
+def submit_completion(client, messages, model=DEFAULT_MODEL, temperature=DEFAULT_TEMPERATURE,
+                      max_tokens=DEFAULT_MAX_TOKENS, priority=INTERACTIVE):
+    # Non-blocking; the future resolves to the raw completion, including its usage
+    return _submit(client, api_messages(messages), model, temperature, max_tokens, priority, "submit")
+
+
+def flight_stats():
+    return _flights.stats()
@@ -0,0 +1,309 @@
+"""Drive app.py with N concurrent simulated users inside one process.
+
+    python loadtest.py --users 20 --turns 5 --think-time 2
+    python loadtest.py --sweep 1,5,10,20,40 --history 200
+
+Each user is a Streamlit AppTest session against the real app.py. Groq is
+replaced by fake_groq.py and Firebase by fake_firebase.py. Users log in,
+load their seeded history, open industry cards and send chat turns with think
+time. The report gives rerun duration, time-to-first-token and end-to-end turn
+latency percentiles, plus the process's CPU use and RSS. The session count
+where the latencies bend upward is where one server process saturates.
+"""
+import argparse
+import datetime
+import logging
+import os
+import random
+import resource
+import statistics
+import tempfile
+import threading
+import time
+
+import clients
+import journal
+import prefetch
+import timing
+
+QUESTIONS = [
+    "What careers suit someone who enjoys biology and working with people?",
+    "How do I move from retail into a technology career?",
+    "Which renewable energy jobs need an engineering degree?",
+    "What certifications help with a cybersecurity career?",
+    "thanks",
+    "2",
+    "What skills do I need for a career in Healthcare?",
+    "Can you help me prepare for a data analyst interview?"
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {"login": [], "rerun": [], "ttft": [], "turn": []}
+        self.errors = 0
+
+    def add(self, name, value):
+        if value is None:
+            return
+        with self._lock:
+            self.samples[name].append(value)
+
+    def error(self):
+        with self._lock:
+            self.errors += 1
+
+
+class ResourceSampler(threading.Thread):
+    """Samples this process's CPU utilisation and RSS once per interval."""
+
+    def __init__(self, interval=1.0):
+        super().__init__(name="resource-sampler", daemon=True)
+        self.interval = interval
+        self.cpu = []
+        self.rss = []
+        self._halt = threading.Event()
+
+    @staticmethod
+    def current_rss():
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except OSError:
+            # Peak rather than current RSS where /proc is unavailable (kilobytes on Linux, bytes on macOS)
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def run(self):
+        last_wall, last_cpu = time.perf_counter(), time.process_time()
+        while not self._halt.wait(self.interval):
+            wall, cpu = time.perf_counter(), time.process_time()
+            self.cpu.append((cpu - last_cpu) / (wall - last_wall))
+            self.rss.append(self.current_rss())
+            last_wall, last_cpu = wall, cpu
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+
+# ----------------- Simulated User ------------------
+def share_test_globals():
+    # AppTest installs a mock Runtime and the appTest config flag for each run and clears
+    # them when the run ends, which pulls them out from under sessions still running on
+    # other threads. Keep both in place for the whole load test.
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    config.get_config_options()
+    config._set_option("global.appTest", True, "loadtest")
+
+    installed = {}
+
+    def instance(cls):
+        if cls._instance is not None:
+            installed["runtime"] = cls._instance
+            return cls._instance
+        if "runtime" in installed:
+            return installed["runtime"]
+        raise RuntimeError("Runtime hasn't been created!")
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or "runtime" in installed)
+
+    # Every AppTest run otherwise compiles app.py afresh, and concurrent compile() calls can
+    # fail on CPython 3.11. A real server compiles once, so share one bytecode cache.
+    shared = ScriptCache()
+    get_bytecode = ScriptCache.get_bytecode
+    ScriptCache.get_bytecode = lambda self, script_path: get_bytecode(shared, script_path)
+
+
+def simulate_user(index, args, recorder, start_gate):
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(args.seed + index)
+    start_gate.wait()
+    time.sleep(rng.uniform(0, args.ramp_up))
+
+    def timed_run(at):
+        started = time.perf_counter()
+        at.run(timeout=args.timeout)
+        elapsed = time.perf_counter() - started
+        recorder.add("rerun", elapsed)
+        if at.exception:
+            recorder.error()
+        return elapsed
+
+    try:
+        at = AppTest.from_file(args.app, default_timeout=args.timeout)
+        timed_run(at)
+
+        # Log in through the sidebar form, which also loads the chat history
+        at.sidebar.text_input[0].input(f"user{index}@example.com")
+        at.sidebar.text_input[1].input("password123")
+        at.sidebar.button[0].click()
+        recorder.add("login", timed_run(at))
+
+        for turn in range(args.turns):
+            time.sleep(rng.expovariate(1.0 / args.think_time) if args.think_time else 0)
+            industry_buttons = [b for b in at.button if (b.key or "").startswith("industry_")]
+            if industry_buttons and rng.random() < args.card_rate:
+                rng.choice(industry_buttons).click()
+                timed_run(at)
+                continue
+            before = len(at.session_state.reply_timings) if "reply_timings" in at.session_state else 0
+            at.chat_input[0].set_value(rng.choice(QUESTIONS))
+            recorder.add("turn", timed_run(at))
+            timings = at.session_state.reply_timings if "reply_timings" in at.session_state else []
+            if len(timings) > before:
+                recorder.add("ttft", timings[-1].get("ttft"))
+    except Exception as e:
+        recorder.error()
+        print(f"user {index} failed: {e!r}")
+
+
+# ----------------- Environment ------------------
+def prepare_environment(args):
+    import fake_firebase
+    import fake_groq
+
+    settings = fake_groq.StandInSettings(
+        tokens_per_second=args.tokens_per_second,
+        ttft=args.ttft,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed
+    )
+    groq_server, groq_url = fake_groq.serve_in_thread(settings=settings)
+    store, fake_auth = fake_firebase.install(latency=args.storage_latency_ms / 1000.0)
+    identity_server, identity_url = fake_firebase.serve_identity_in_thread(fake_auth)
+
+    os.environ["GROQ_BASE_URL"] = groq_url
+    os.environ["GROQ_API_KEY"] = "load-test"
+    os.environ["FIREBASE_API_KEY"] = "load-test"
+    os.environ["IDENTITY_TOOLKIT_URL"] = identity_url
+    os.environ["SECURE_TOKEN_URL"] = identity_url
+    # Caches would hide the generation path this harness is meant to measure
+    os.environ.setdefault("RESPONSE_CACHE", "0")
+    os.environ.setdefault("SEMANTIC_CACHE", "0")
+    # A fresh chat journal per run, so earlier runs are not replayed into this one
+    os.environ["JOURNAL_PATH"] = os.path.join(tempfile.mkdtemp(prefix="loadtest-"), "chat_journal.jsonl")
+    # The shared clients still point at the previous run's stand-ins
+    clients.reset_clients()
+    return store, fake_auth, (groq_server, identity_server)
+
+
+def seed_users(store, fake_auth, count, history):
+    start = datetime.datetime.now() - datetime.timedelta(days=30)
+    for index in range(count):
+        user = fake_auth.add_user(f"user{index}@example.com", "password123", f"User {index}")
+        chats = store.collection("users").document(user.uid).collection("chats")
+        for n in range(history):
+            store.write(f"{chats._path}/seed{n:06d}", {
+                "role": "user" if n % 2 == 0 else "assistant",
+                "content": f"Earlier message {n} about career planning and next steps.",
+                "timestamp": start + datetime.timedelta(minutes=n)
+            }, False)
+
+
+def run_load(args, users):
+    store, fake_auth, _ = prepare_environment(args)
+    timing.reset()
+    prefetch.stats.reset()
+    share_test_globals()
+    seed_users(store, fake_auth, users, args.history)
+    recorder = Recorder()
+    sampler = ResourceSampler()
+    gate = threading.Event()
+    threads = [threading.Thread(target=simulate_user, args=(i, args, recorder, gate), daemon=True)
+               for i in range(users)]
+    for thread in threads:
+        thread.start()
+    sampler.start()
+    started = time.perf_counter()
+    gate.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    sampler.stop()
+    return recorder, sampler, elapsed, store
+
+
+def format_ms(value):
+    return "-" if value is None else f"{value * 1000:.0f}"
+
+
+def report(users, recorder, sampler, elapsed, store):
+    print(f"\n=== {users} concurrent users, {elapsed:.1f}s, {recorder.errors} errors ===")
+    print(f"{'metric':<8} {'count':>6} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name in ("login", "rerun", "ttft", "turn"):
+        values = recorder.samples[name]
+        print(f"{name:<8} {len(values):>6} {format_ms(percentile(values, 50)):>8} {format_ms(percentile(values, 90)):>8} "
+              f"{format_ms(percentile(values, 99)):>8} {format_ms(max(values) if values else None):>8}")
+    if sampler.cpu:
+        print(f"cpu      mean {statistics.mean(sampler.cpu) * 100:.0f}%  peak {max(sampler.cpu) * 100:.0f}% of one core")
+        print(f"rss      mean {statistics.mean(sampler.rss) / 2**20:.0f} MiB  peak {max(sampler.rss) / 2**20:.0f} MiB")
+    print(f"storage  {store.stats()}")
+    stats = journal.journal_stats()
+    if stats:
+        print(f"journal  pending {stats['pending']}  lag {stats['lag_seconds'] * 1000:.0f} ms  "
+              f"flushed {stats['flushed']} in {stats['batches']} batches  failures {stats['failures']}  "
+              f"set aside {stats['set_aside']}")
+    outcomes = prefetch.stats.snapshot()
+    if outcomes["issued"]:
+        print(f"prefetch issued {outcomes['issued']}  hits {outcomes['hits']}  misses {outcomes['misses']}  "
+              f"hit rate {outcomes['hit_rate']:.0%}  used {outcomes['used_tokens']} tokens  "
+              f"wasted {outcomes['wasted_tokens']} tokens  shed {outcomes['shed']}")
+    health = clients.get_clients().health()
+    print("clients  " + "  ".join(
+        f"{name} {'ok' if status['ok'] else 'failing'} {status['latency'] * 1000:.0f} ms"
+        for name, status in sorted(health["clients"].items())
+    ) + f"  reconnects {health['reconnects']}")
+    phases = timing.snapshot()
+    print(f"\n{'phase':<18} {'count':>6} {'mean ms':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+    for phase, summary in sorted(phases.items()):
+        if summary["count"]:
+            print(f"{phase:<18} {summary['count']:>6} {format_ms(summary['mean']):>8} {format_ms(summary['p50']):>8} "
+                  f"{format_ms(summary['p90']):>8} {format_ms(summary['p99']):>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-session load generator for app.py")
+    parser.add_argument("--app", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py"))
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--sweep", help="comma-separated user counts to run one after another, e.g. 1,5,10,20")
+    parser.add_argument("--turns", type=int, default=5, help="interactions per user after login")
+    parser.add_argument("--think-time", type=float, default=2.0, help="mean seconds between interactions")
+    parser.add_argument("--ramp-up", type=float, default=2.0, help="spread user start times over this many seconds")
+    parser.add_argument("--card-rate", type=float, default=0.25, help="chance an interaction opens an industry card")
+    parser.add_argument("--history", type=int, default=50, help="seeded chat messages per user")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds allowed per rerun")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--completion-tokens", type=int, default=150)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--storage-latency-ms", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # Simulated users run outside a ScriptRunContext, which Streamlit warns about on every thread
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").setLevel(logging.ERROR)
+    counts = [int(n) for n in args.sweep.split(",")] if args.sweep else [args.users]
+    for users in counts:
+        recorder, sampler, elapsed, store = run_load(args, users)
+        report(users, recorder, sampler, elapsed, store)
+
+
+if __name__ == "__main__":
+    main()
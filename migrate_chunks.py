@@ -0,0 +1,125 @@
+"""Convert per-message chat collections into chunked conversation documents.
+
+    python migrate_chunks.py --workers 8
+    python migrate_chunks.py --users uid1,uid2 --force
+
+Switch the app to CHAT_LAYOUT=chunks first. Until a user is migrated the app
+still reads their older history from users/{uid}/chats, and new messages
+already go to chunks. Each user's messages are packed in timestamp order into
+chunk documents with deterministic legacy-* ids. A re-run merges into the same
+documents instead of replacing them, and the app never appends live messages
+to them. Finished users are marked with chat_layout="chunks" on their user
+document and skipped by later runs, which lets an interrupted migration resume.
+The per-message documents are left in place.
+"""
+import argparse
+import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import firebase_admin
+from firebase_admin import credentials, firestore
+
+from chat_store import (CHUNK_MAX_BYTES, CHUNK_MAX_MESSAGES, CONVERSATION_ID, LEGACY_CHUNK_PREFIX, ChunkLayout,
+                        message_fields, message_size)
+
+# A Firestore batch takes at most 500 writes
+BATCH_WRITES = 400
+
+
+def pack(messages, max_messages=CHUNK_MAX_MESSAGES, max_bytes=CHUNK_MAX_BYTES):
+    chunks = []
+    current, size = [], 0
+    for msg in messages:
+        added = message_size(msg)
+        if current and (len(current) + 1 > max_messages or size + added > max_bytes):
+            chunks.append(current)
+            current, size = [], 0
+        current.append(msg)
+        size += added
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def migrate_user(db, uid, layout, force=False, retries=3):
+    # Returns the number of messages migrated, or None when the user was already done
+    user_ref = db.collection("users").document(uid)
+    user = user_ref.get()
+    # Users who never migrated have no chat_layout field, and a real snapshot raises KeyError for it
+    if (user.to_dict() or {}).get("chat_layout") == "chunks" and not force:
+        return None
+    messages = [
+        dict(message_fields(doc.to_dict()), id=doc.id)
+        for doc in layout.legacy.chats(uid).order_by("timestamp").stream()
+    ]
+    chunks = pack(messages, layout.max_messages, layout.max_bytes)
+    for start in range(0, len(chunks), BATCH_WRITES):
+        batch = db.batch()
+        for n, chunk in enumerate(chunks[start:start + BATCH_WRITES], start):
+            # Merged with ArrayUnion, so a re-run keeps anything already in the chunk
+            batch.set(layout.chunks(uid).document(f"{LEGACY_CHUNK_PREFIX}{n:06d}"), {
+                "messages": firestore.ArrayUnion(chunk),
+                "first_timestamp": chunk[0]["timestamp"],
+                "last_timestamp": chunk[-1]["timestamp"],
+                "count": len(chunk),
+                "bytes": sum(message_size(m) for m in chunk)
+            }, merge=True)
+        for attempt in range(retries):
+            try:
+                batch.commit()
+                break
+            except Exception:
+                if attempt == retries - 1:
+                    raise
+                # Back off on contention and transient errors
+                time.sleep(2 ** attempt)
+    # Marked last, so a user interrupted mid-way is picked up again on the next run
+    user_ref.set({"chat_layout": "chunks", "chunks_migrated_at": datetime.datetime.now()}, merge=True)
+    return len(messages)
+
+
+def migrate(db, uids=None, workers=8, force=False, conversation=CONVERSATION_ID):
+    layout = ChunkLayout(db, conversation)
+    if uids is None:
+        # list_documents also finds users that only exist as a parent of their chats
+        uids = [ref.id for ref in db.collection("users").list_documents()]
+    migrated = skipped = failed = messages = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(migrate_user, db, uid, layout, force): uid for uid in uids}
+        for future in as_completed(futures):
+            uid = futures[future]
+            try:
+                count = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"failed {uid}: {e}")
+                continue
+            if count is None:
+                skipped += 1
+            else:
+                migrated += 1
+                messages += count
+    return {"migrated": migrated, "skipped": skipped, "failed": failed, "messages": messages}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate chat history to chunked conversation documents")
+    parser.add_argument("--users", help="comma-separated uids; defaults to every user")
+    parser.add_argument("--workers", type=int, default=8, help="users migrated in parallel")
+    parser.add_argument("--force", action="store_true", help="migrate users that are already marked as done")
+    parser.add_argument("--conversation", default=CONVERSATION_ID)
+    args = parser.parse_args()
+
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(credentials.Certificate("key.json"))
+    db = firestore.client()
+    uids = args.users.split(",") if args.users else None
+    started = time.perf_counter()
+    result = migrate(db, uids, args.workers, args.force, args.conversation)
+    print(f"{result['migrated']} users migrated ({result['messages']} messages), {result['skipped']} already done, "
+          f"{result['failed']} failed in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
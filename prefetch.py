@@ -0,0 +1,166 @@
+import os
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import numpy as np
+
+from conversation import estimate_tokens
+from faq import FAQ_TEMPLATES, faq_answer, mentions_industry
+from industries import get_growing_industries
+from llm import submit_completion
+from scheduler import BACKGROUND, SchedulerBusy
+from semantic_cache import hashed_counts
+from timing import record
+
+# Optional: PREFETCH=1 answers the likely follow-up to an opened industry card in the background
+PREFETCH_ENABLED = os.getenv("PREFETCH", "0") == "1"
+PREFETCH_MATCH_THRESHOLD = float(os.getenv("PREFETCH_MATCH_THRESHOLD", "0.45"))
+# How long a matching follow-up waits for a prefetch that is still generating
+PREFETCH_WAIT_SECONDS = float(os.getenv("PREFETCH_WAIT_SECONDS", "15"))
+
+
+# ----------------- Metrics ------------------
+class PrefetchStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.issued = 0
+        self.hits = 0
+        self.misses = 0
+        self.shed = 0
+        self.used_tokens = 0
+        self.wasted_tokens = 0
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def reset(self):
+        with self._lock:
+            self.issued = self.hits = self.misses = self.shed = 0
+            self.used_tokens = self.wasted_tokens = 0
+
+    def snapshot(self):
+        with self._lock:
+            resolved = self.hits + self.misses
+            return {
+                "issued": self.issued,
+                "hits": self.hits,
+                "misses": self.misses,
+                "shed": self.shed,
+                "hit_rate": self.hits / resolved if resolved else 0.0,
+                "used_tokens": self.used_tokens,
+                "wasted_tokens": self.wasted_tokens
+            }
+
+
+stats = PrefetchStats()
+
+
+# ----------------- Follow-up Prediction ------------------
+def follow_up_question(industry):
+    # The overview card ends by asking what the user wants to explore; this is the usual answer
+    return FAQ_TEMPLATES[0].format(industry=industry["industry"])
+
+
+def similarity(a, b, dim=4096):
+    x = hashed_counts(a, dim)
+    y = hashed_counts(b, dim)
+    norm = np.linalg.norm(x) * np.linalg.norm(y)
+    return float(x @ y / norm) if norm else 0.0
+
+
+def completion_tokens(completion):
+    usage = getattr(completion, "usage", None)
+    if usage is not None and getattr(usage, "completion_tokens", None) is not None:
+        return usage.completion_tokens
+    return estimate_tokens(completion.choices[0].message.content or "")
+
+
+# ----------------- Per-session Slot ------------------
+class PrefetchSlot:
+    """Holds one background answer for the current session until the next user turn."""
+
+    def __init__(self, industry, question, future):
+        self.industry = industry["industry"]
+        self.question = question
+        self.future = future
+        self.started_at = time.perf_counter()
+        self._resolved = False
+
+    def matches(self, text):
+        # Naming the industry is not enough: "salaries in healthcare?" must not get the in-demand careers answer
+        if similarity(text, self.question) < PREFETCH_MATCH_THRESHOLD:
+            return False
+        # The industry is one token of the score, so the same question about another industry still scores high
+        return not any(mentions_industry(other["industry"], text) for other in get_growing_industries()
+                       if other["industry"] != self.industry)
+
+    def _miss(self, reason):
+        # Outcomes go to the timing histograms (and its log), where the load test reports them
+        stats.add(misses=1)
+        record("prefetch_miss", time.perf_counter() - self.started_at, industry=self.industry, reason=reason)
+
+    def take(self, text):
+        # Returns the prefetched answer when the follow-up matches, otherwise discards the slot
+        if self._resolved:
+            return None
+        if not self.matches(text):
+            self.discard("different_question")
+            return None
+        self._resolved = True
+        if self.future.cancel():
+            # Still waiting behind interactive turns; answering normally is faster
+            self._miss("not_started")
+            return None
+        waited = time.perf_counter()
+        try:
+            completion = self.future.result(timeout=PREFETCH_WAIT_SECONDS)
+        except FutureTimeout:
+            self.future.add_done_callback(self._count_waste)
+            self._miss("timeout")
+            return None
+        except Exception:
+            self._miss("error")
+            return None
+        tokens = completion_tokens(completion)
+        stats.add(hits=1, used_tokens=tokens)
+        record("prefetch_hit", time.perf_counter() - waited, industry=self.industry, tokens=tokens)
+        return completion.choices[0].message.content
+
+    def discard(self, reason="discarded"):
+        if self._resolved:
+            return
+        self._resolved = True
+        self._miss(reason)
+        if not self.future.cancel():
+            self.future.add_done_callback(self._count_waste)
+
+    def _count_waste(self, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        tokens = completion_tokens(future.result())
+        stats.add(wasted_tokens=tokens)
+        record("prefetch_wasted", time.perf_counter() - self.started_at, industry=self.industry, tokens=tokens)
+
+
+def start_prefetch(client, transcript, industry, model=None, max_tokens=None):
+    question = follow_up_question(industry)
+    if faq_answer(question, industry["industry"]):
+        # Already pre-generated by faq_batch.py, so the chat path will serve it directly (faq.stored_reply)
+        return None
+    prompt = transcript.build() + [{"role": "user", "content": question}]
+    kwargs = {"priority": BACKGROUND}
+    if model:
+        kwargs["model"] = model
+    if max_tokens:
+        kwargs["max_tokens"] = max_tokens
+    try:
+        future = submit_completion(client, prompt, **kwargs)
+    except SchedulerBusy:
+        # Background work is the first to be shed under load
+        stats.add(shed=1)
+        return None
+    stats.add(issued=1)
+    return PrefetchSlot(industry, question, future)
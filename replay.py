@@ -0,0 +1,176 @@
+"""Re-issue a recorded request log against the local Groq stand-in.
+
+    python replay.py logs/requests.jsonl
+    python replay.py logs/requests.jsonl --speed 4 --tokens-per-second 120
+    python replay.py logs/requests.jsonl --base-url http://127.0.0.1:8765 --all
+
+Requests go out at their recorded arrival offsets divided by --speed, with the
+recorded model, prompt size and reply length, so capacity can be tested with
+real traffic shapes. Prompts are rebuilt from the log when it holds content
+(REQUEST_LOG_CONTENT=1) and padded to the recorded size otherwise. Rotated
+files next to the log are replayed too, oldest first.
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from groq import Groq
+
+import fake_groq
+from request_log import rotated_paths
+
+FILLER = "Earlier conversation about career options, skills and training. "
+
+
+def load_entries(path, include_all=False, backups=None):
+    # Cached and coalesced requests never reached the API, so they are skipped unless --all
+    paths = rotated_paths(path) if backups is None else rotated_paths(path, backups)
+    entries = []
+    for p in paths:
+        with open(p, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if include_all or entry.get("status") in ("ok", "error"):
+                    entries.append(entry)
+    entries.sort(key=lambda e: e["ts"])
+    return entries
+
+
+def build_messages(entry):
+    if entry.get("prompt"):
+        return entry["prompt"]
+    chars = entry.get("prompt_chars") or 4 * (entry.get("prompt_tokens") or 100)
+    text = (FILLER * (chars // len(FILLER) + 1))[:max(chars, 1)]
+    return [{"role": "user", "content": text}]
+
+
+def reply_tokens(entry):
+    # Ask for as many tokens as the original reply had, so the stand-in takes as long
+    return entry.get("completion_tokens") or max(1, (entry.get("response_chars") or 400) // 4)
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+class Results:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = []
+        self.ttft = []
+        self.lag = []
+        self.errors = 0
+
+    def add(self, latency=None, ttft=None, lag=None, error=False):
+        with self._lock:
+            if error:
+                self.errors += 1
+            if latency is not None:
+                self.latency.append(latency)
+            if ttft is not None:
+                self.ttft.append(ttft)
+            if lag is not None:
+                self.lag.append(lag)
+
+
+def issue(client, entry, due, results):
+    started = time.perf_counter()
+    stream = entry.get("kind") == "stream"
+    try:
+        response = client.chat.completions.create(
+            model=entry.get("model") or "llama3-70b-8192",
+            messages=build_messages(entry),
+            temperature=entry.get("temperature") or 0.7,
+            max_tokens=reply_tokens(entry),
+            stream=stream
+        )
+        ttft = None
+        if stream:
+            for chunk in response:
+                if ttft is None and chunk.choices and chunk.choices[0].delta.content:
+                    ttft = time.perf_counter() - started
+        results.add(latency=time.perf_counter() - started, ttft=ttft, lag=started - due)
+    except Exception:
+        results.add(error=True, lag=started - due)
+
+
+def replay(entries, client, speed=1.0, max_concurrency=64):
+    results = Results()
+    if not entries:
+        return results, 0.0
+    first = entries[0]["ts"]
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        began = time.perf_counter()
+        for entry in entries:
+            due = began + (entry["ts"] - first) / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(issue, client, entry, due, results)
+    return results, time.perf_counter() - began
+
+
+def format_ms(value):
+    return "-" if value is None else f"{value * 1000:.0f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded request log against the Groq stand-in")
+    parser.add_argument("log", nargs="?", default="logs/requests.jsonl")
+    parser.add_argument("--speed", type=float, default=1.0, help="arrival rate multiplier; 2 replays twice as fast")
+    parser.add_argument("--all", action="store_true", help="also replay requests that were served from caches")
+    parser.add_argument("--limit", type=int, help="replay only the first N requests")
+    parser.add_argument("--max-concurrency", type=int, default=64)
+    parser.add_argument("--base-url", help="existing stand-in to target; by default one is started in-process")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    entries = load_entries(args.log, include_all=args.all)[:args.limit]
+    if not entries:
+        print(f"No replayable requests in {args.log}")
+        return
+    base_url = args.base_url
+    if not base_url:
+        settings = fake_groq.StandInSettings(
+            tokens_per_second=args.tokens_per_second,
+            ttft=args.ttft,
+            completion_tokens=max(reply_tokens(e) for e in entries),
+            error_rate=args.error_rate,
+            rate_limit_rate=args.rate_limit_rate,
+            seed=args.seed
+        )
+        _, base_url = fake_groq.serve_in_thread(settings=settings)
+    # Retries would change the arrival pattern being replayed
+    client = Groq(api_key="replay", base_url=base_url, max_retries=0)
+
+    span = (entries[-1]["ts"] - entries[0]["ts"]) / args.speed
+    print(f"Replaying {len(entries)} requests over {span:.1f}s against {base_url}")
+    results, elapsed = replay(entries, client, args.speed, args.max_concurrency)
+
+    print(f"\n=== {len(entries)} requests, {elapsed:.1f}s, {len(entries) / max(elapsed, 1e-9):.1f} req/s, "
+          f"{results.errors} errors ===")
+    print(f"{'metric':<8} {'count':>6} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+    for name in ("latency", "ttft", "lag"):
+        values = getattr(results, name)
+        print(f"{name:<8} {len(values):>6} {format_ms(percentile(values, 50)):>8} {format_ms(percentile(values, 90)):>8} "
+              f"{format_ms(percentile(values, 99)):>8} {format_ms(statistics.mean(values) if values else None):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+
+# One JSON line per LLM request; REQUEST_LOG=0 turns the log off
+REQUEST_LOG = os.getenv("REQUEST_LOG", os.path.join("logs", "requests.jsonl"))
+REQUEST_LOG_MAX_MB = float(os.getenv("REQUEST_LOG_MAX_MB", "20"))
+REQUEST_LOG_BACKUPS = int(os.getenv("REQUEST_LOG_BACKUPS", "5"))
+REQUEST_LOG_FLUSH_SECONDS = float(os.getenv("REQUEST_LOG_FLUSH_SECONDS", "1"))
+# Prompts and replies are user content, so they are only kept when asked for
+REQUEST_LOG_CONTENT = os.getenv("REQUEST_LOG_CONTENT", "0") == "1"
+
+_CLOSE = object()
+
+
+def usage_dict(usage):
+    # Groq reports usage on the completion, or on the last stream chunk under x_groq
+    if usage is None:
+        return {}
+    if isinstance(usage, dict):
+        get = usage.get
+    else:
+        def get(name):
+            return getattr(usage, name, None)
+    return {name: get(name) for name in ("prompt_tokens", "completion_tokens", "total_tokens") if get(name) is not None}
+
+
+def rotated_paths(path, backups=REQUEST_LOG_BACKUPS):
+    # Oldest first: requests.jsonl.5 ... requests.jsonl.1, requests.jsonl
+    paths = [f"{path}.{i}" for i in range(backups, 0, -1)] + [path]
+    return [p for p in paths if os.path.exists(p)]
+
+
+# ----------------- Buffered Writer ------------------
+class RequestLog:
+    """Appends entries from a background thread in batches so callers never wait on disk.
+
+    Files rotate at max_bytes and keep `backups` older files, which caps the log at
+    max_bytes * (backups + 1). When the writer falls behind by max_pending entries,
+    new entries are dropped and counted rather than blocking the caller.
+    """
+
+    def __init__(self, path=REQUEST_LOG, max_bytes=int(REQUEST_LOG_MAX_MB * 1024 * 1024),
+                 backups=REQUEST_LOG_BACKUPS, flush_interval=REQUEST_LOG_FLUSH_SECONDS, max_pending=10000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self._pending = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+        self.errors = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._size = self._file.tell()
+        self._thread = threading.Thread(target=self._run, name="request-log", daemon=True)
+        self._thread.start()
+
+    def write(self, entry):
+        try:
+            self._pending.put_nowait(entry)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._size = 0
+        self.rotations += 1
+
+    def _write_batch(self, batch):
+        for entry in batch:
+            line = json.dumps(entry, default=str) + "\n"
+            size = len(line.encode("utf-8"))
+            if self._size and self._size + size > self.max_bytes:
+                self._rotate()
+            self._file.write(line)
+            self._size += size
+        self._file.flush()
+        with self._lock:
+            self.written += len(batch)
+
+    def _run(self):
+        closing = False
+        while not closing:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            # Gather whatever arrives within one flush interval into a single write
+            while True:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    entry = self._pending.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if entry is _CLOSE:
+                    closing = True
+                    break
+                batch.append(entry)
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except OSError:
+                    with self._lock:
+                        self.errors += 1
+        self._file.close()
+
+    def close(self, timeout=5):
+        # Writes everything queued so far and stops the writer
+        if self._thread.is_alive():
+            self._pending.put(_CLOSE)
+            self._thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "written": self.written,
+                "dropped": self.dropped,
+                "pending": self._pending.qsize(),
+                "rotations": self.rotations,
+                "errors": self.errors
+            }
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_request_log():
+    # Returns None when REQUEST_LOG=0
+    global _log
+    if not REQUEST_LOG or REQUEST_LOG == "0":
+        return None
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                _log = RequestLog()
+                atexit.register(_log.close)
+    return _log
+
+
+def log_request(kind, model, messages, max_tokens, temperature, started_at, latency, status="ok",
+                queue_time=None, ttft=None, usage=None, response=None, error=None, priority=None):
+    # started_at is wall-clock time, so replays can reproduce the original arrival pattern
+    log = get_request_log()
+    if log is None:
+        return
+    entry = {
+        "ts": round(started_at, 3),
+        "kind": kind,
+        "status": status,
+        "model": model,
+        "priority": priority,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "messages": len(messages),
+        "prompt_chars": sum(len(m["content"] or "") for m in messages),
+        "queue_time": round(queue_time, 4) if queue_time is not None else None,
+        "ttft": round(ttft, 4) if ttft is not None else None,
+        "latency": round(latency, 4),
+        "response_chars": len(response) if response is not None else None
+    }
+    entry.update(usage_dict(usage))
+    if error is not None:
+        entry["error"] = type(error).__name__
+    if REQUEST_LOG_CONTENT:
+        entry["prompt"] = messages
+        entry["response"] = response
+    log.write(entry)
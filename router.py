@@ -0,0 +1,64 @@
+import json
+import os
+import re
+import time
+from collections import namedtuple
+
+from canned import MENU_CHOICE
+from llm import DEFAULT_MODEL, DEFAULT_MAX_TOKENS
+from timing import record
+
+# ----------------- Model Table ------------------
+# Override with MODEL_TABLE='{"fast": {"model": "...", "max_tokens": 512}, "large": {...}}'
+DEFAULT_MODEL_TABLE = {
+    "fast": {"model": "llama3-8b-8192", "max_tokens": 512},
+    "large": {"model": DEFAULT_MODEL, "max_tokens": DEFAULT_MAX_TOKENS}
+}
+
+
+def load_model_table():
+    table = {tier: dict(entry) for tier, entry in DEFAULT_MODEL_TABLE.items()}
+    override = os.getenv("MODEL_TABLE")
+    if override:
+        for tier, entry in json.loads(override).items():
+            table.setdefault(tier, {}).update(entry)
+    return table
+
+
+MODEL_TABLE = load_model_table()
+ROUTING_ENABLED = os.getenv("ROUTING", "1") != "0"
+
+# ----------------- Turn Classification ------------------
+ACKNOWLEDGEMENTS = {
+    "thanks", "thank you", "thx", "ok", "okay", "yes", "no", "sure", "great", "cool",
+    "got it", "nice", "perfect", "alright", "hi", "hello", "hey", "bye"
+}
+# Words that signal a request for real advice, even in a short message
+ADVICE_TERMS = {
+    "career", "careers", "job", "jobs", "resume", "cv", "salary", "interview", "industry",
+    "skills", "skill", "course", "degree", "study", "recommend", "should", "switch", "future"
+}
+
+Route = namedtuple("Route", ["tier", "model", "max_tokens", "reason", "latency"])
+
+
+def classify(text):
+    normalized = re.sub(r"[^\w\s]", "", text.strip().lower())
+    words = normalized.split()
+    if MENU_CHOICE.match(text):
+        return "fast", "menu choice"
+    if normalized in ACKNOWLEDGEMENTS:
+        return "fast", "acknowledgement"
+    if len(words) <= 6 and not ADVICE_TERMS.intersection(words):
+        return "fast", "short turn"
+    return "large", "open-ended"
+
+
+def route(text):
+    started = time.perf_counter()
+    tier, reason = classify(text) if ROUTING_ENABLED else ("large", "routing disabled")
+    entry = MODEL_TABLE.get(tier) or MODEL_TABLE["large"]
+    latency = time.perf_counter() - started
+    # Into the timing histograms and log with every other phase, streamed or not
+    record("route", latency, tier=tier, model=entry["model"], reason=reason)
+    return Route(tier, entry["model"], entry.get("max_tokens", DEFAULT_MAX_TOKENS), reason, latency)
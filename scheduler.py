@@ -0,0 +1,103 @@
+import itertools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# ----------------- Priorities ------------------
+# Lower numbers are served first
+INTERACTIVE = 0
+BACKGROUND = 10
+
+BUSY_MESSAGE = "⏳ I'm helping a lot of people right now. Please try again in a moment."
+
+
+class SchedulerBusy(Exception):
+    pass
+
+
+# ----------------- Generation Scheduler ------------------
+class GenerationScheduler:
+    """Process-wide bounded worker pool for LLM calls with priority queueing and load shedding."""
+
+    def __init__(self, max_workers=4, max_queue_depth=32, max_background_depth=None):
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        # Background work is shed earlier so it never crowds out interactive turns
+        self.max_background_depth = max_background_depth if max_background_depth is not None else max_queue_depth // 2
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._active = 0
+        self.submitted = 0
+        self.shed = 0
+        self.completed = 0
+        self._workers = []
+        for i in range(max_workers):
+            worker = threading.Thread(target=self._run, name=f"generation-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, fn, *args, priority=INTERACTIVE, **kwargs):
+        limit = self.max_queue_depth if priority <= INTERACTIVE else self.max_background_depth
+        with self._lock:
+            if self._pending >= limit:
+                self.shed += 1
+                raise SchedulerBusy(f"generation queue is full ({self._pending} waiting)")
+            self._pending += 1
+            self.submitted += 1
+        future = Future()
+        self._queue.put((priority, next(self._seq), time.perf_counter(), future, fn, args, kwargs))
+        return future
+
+    def run(self, fn, *args, priority=INTERACTIVE, **kwargs):
+        return self.submit(fn, *args, priority=priority, **kwargs).result()
+
+    def _run(self):
+        while True:
+            priority, _, enqueued_at, future, fn, args, kwargs = self._queue.get()
+            with self._lock:
+                self._pending -= 1
+                self._active += 1
+            try:
+                if future.set_running_or_notify_cancel():
+                    future.queue_time = time.perf_counter() - enqueued_at
+                    try:
+                        future.set_result(fn(*args, **kwargs))
+                    except BaseException as e:
+                        future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self.completed += 1
+                self._queue.task_done()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "active": self._active,
+                "queued": self._pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "shed": self.shed
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    # Streamlit reruns app.py per session, but imported modules live for the whole process
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = GenerationScheduler(
+                    max_workers=int(os.getenv("GENERATION_WORKERS", "4")),
+                    max_queue_depth=int(os.getenv("GENERATION_QUEUE_DEPTH", "32"))
+                )
+    return _scheduler
@@ -0,0 +1,196 @@
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+# ----------------- Local Embeddings ------------------
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "in", "on", "for", "to", "is", "are", "be", "me", "my",
+    "i", "you", "your", "what", "which", "how", "do", "does", "can", "could", "would", "should",
+    "there", "any", "some", "about", "with", "that", "this", "it", "tell", "please", "give"
+}
+# Collapse near-synonyms so paraphrases land in the same hash buckets
+SYNONYMS = {
+    "job": "career", "occupation": "career", "profession": "career", "role": "career",
+    "work": "career", "opportunity": "career", "field": "industry", "sector": "industry",
+    "growing": "growth", "grow": "growth", "demand": "growth", "tech": "technology",
+    "medical": "healthcare", "health": "healthcare"
+}
+
+
+def tokenize(text):
+    terms = []
+    for word in re.findall(r"[a-z0-9+#]+", text.lower()):
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        word = SYNONYMS.get(word, word)
+        if word not in STOPWORDS:
+            terms.append(word)
+    return terms
+
+
+def hashed_counts(text, dim):
+    terms = tokenize(text)
+    # Unordered bigrams, so "healthcare careers" matches "careers in healthcare"
+    terms += [" ".join(sorted(pair)) for pair in zip(terms, terms[1:])]
+    counts = np.zeros(dim, dtype=np.float32)
+    for term in terms:
+        counts[zlib.crc32(term.encode("utf-8")) % dim] += 1.0
+    return counts
+
+
+def first_turn_question(messages):
+    # Only an opening question is safe to answer from another user's conversation
+    if not messages or messages[-1]["role"] != "user":
+        return None
+    earlier = messages[:-1]
+    if len(earlier) > 1 or any(m["role"] != "system" for m in earlier):
+        return None
+    return messages[-1]["content"]
+
+
+# ----------------- Vector Index ------------------
+def partition(messages, params):
+    # The generation parameters and the system prompt an answer was written under
+    return (params, messages[0]["content"] if len(messages) > 1 else None)
+
+
+def substituted(a, b):
+    # Each question has a content term the other lacks ("remote jobs in tech" / "... in healthcare",
+    # "best" / "worst"): one word swapped for another changes the answer but barely moves the score
+    return bool(a - b) and bool(b - a)
+
+
+class SemanticCache:
+    """Serves stored answers to first-turn questions that closely match an earlier one.
+
+    A question matches when its IDF-weighted cosine clears the threshold and it
+    only adds to or drops words from the stored question, never swaps one. The
+    default threshold lets a short question gain one qualifier ("jobs in
+    healthcare?" / "what healthcare careers are growing" scores about 0.59),
+    while two or more new terms fall below it. Entries are kept apart by the
+    generation parameters (model, temperature, max_tokens) and system prompt,
+    as cache_key does.
+    """
+
+    def __init__(self, dim=4096, threshold=0.55, max_entries=512, ttl=86400):
+        self.dim = dim
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._counts = np.zeros((0, dim), dtype=np.float32)
+        self._entries = []
+        self._df = np.zeros(dim, dtype=np.float32)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+
+    def _idf(self):
+        n = len(self._entries)
+        return np.log((1.0 + n) / (1.0 + self._df)) + 1.0
+
+    def _normalize(self, matrix):
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _remove(self, index):
+        self._df -= (self._counts[index] > 0)
+        self._counts = np.delete(self._counts, index, axis=0)
+        del self._entries[index]
+
+    def _expire(self, now):
+        for index in range(len(self._entries) - 1, -1, -1):
+            if self._entries[index]["expires_at"] < now:
+                self._remove(index)
+
+    def lookup(self, messages, params=None):
+        question = first_turn_question(messages)
+        if question is None:
+            self.bypassed += 1
+            return None
+        query = hashed_counts(question, self.dim)
+        with self._lock:
+            now = time.time()
+            self._expire(now)
+            if not self._entries or not query.any():
+                self.misses += 1
+                return None
+            idf = self._idf()
+            matrix = self._normalize(self._counts * idf)
+            scores = matrix @ self._normalize(query * idf)
+            terms = set(tokenize(question))
+            group = partition(messages, params)
+            for index, entry in enumerate(self._entries):
+                if entry["partition"] != group or substituted(terms, entry["terms"]):
+                    scores[index] = -1.0
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+            entry = self._entries[best]
+            entry["last_used"] = now
+            self.hits += 1
+            return entry["answer"]
+
+    def store(self, messages, answer, params=None):
+        question = first_turn_question(messages)
+        if question is None or not answer:
+            return
+        counts = hashed_counts(question, self.dim)
+        if not counts.any():
+            return
+        with self._lock:
+            now = time.time()
+            self._expire(now)
+            while len(self._entries) >= self.max_entries:
+                # Evict the least recently used question
+                oldest = min(range(len(self._entries)), key=lambda i: self._entries[i]["last_used"])
+                self._remove(oldest)
+                self.evictions += 1
+            self._counts = np.vstack([self._counts, counts[None, :]])
+            self._df += (counts > 0)
+            self._entries.append({
+                "question": question,
+                "terms": set(tokenize(question)),
+                "partition": partition(messages, params),
+                "answer": answer,
+                "expires_at": now + self.ttl,
+                "last_used": now
+            })
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_semantic_cache():
+    # Returns None when SEMANTIC_CACHE=0
+    global _cache
+    if os.getenv("SEMANTIC_CACHE", "1") == "0":
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticCache(
+                    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.55")),
+                    max_entries=int(os.getenv("SEMANTIC_CACHE_ENTRIES", "512")),
+                    ttl=int(os.getenv("SEMANTIC_CACHE_TTL", "86400"))
+                )
+    return _cache
@@ -0,0 +1,123 @@
+import hashlib
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+CACHE_DIR = os.getenv("RESPONSE_CACHE_DIR", ".cache")
+# REMEMBER_ME=0 turns the "Remember me" option off entirely
+REMEMBER_ME_ENABLED = os.getenv("REMEMBER_ME", "1") != "0"
+# A remembered login lasts this long from sign-in, however often it is used
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_DAYS", "7")) * 24 * 3600
+
+
+def _digest(text):
+    # Only hashes of the browser's key and user agent are stored, so the table alone cannot resume a session
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# ----------------- Remembered Sessions ------------------
+class SessionStore:
+    """Remembered logins, keyed by an opaque random key the browser keeps in a cookie.
+
+    Each row holds the user's Firebase refresh token and the latest ID token
+    with its expiry, so a reload can resume the session from local state and
+    only calls the token endpoint once the ID token has expired. A key only
+    works from the user agent it was issued to and expires ttl seconds after
+    sign-in.
+    """
+
+    def __init__(self, path, ttl=SESSION_TTL_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.restored = 0
+        self.refreshed = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(sessions)")]
+            if columns and "agent_hash" not in columns:
+                # Rows from before keys were bound to a browser (and carried in the URL) are not honoured
+                conn.execute("DROP TABLE sessions")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    key_hash TEXT PRIMARY KEY,
+                    agent_hash TEXT NOT NULL,
+                    uid TEXT NOT NULL,
+                    email TEXT NOT NULL,
+                    username TEXT NOT NULL,
+                    id_token TEXT NOT NULL,
+                    refresh_token TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def create(self, uid, email, username, id_token, refresh_token, expires_in, user_agent):
+        # Returns the key to hand to the browser
+        key = secrets.token_urlsafe(32)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO sessions (key_hash, agent_hash, uid, email, username, id_token, refresh_token, "
+                "expires_at, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (_digest(key), _digest(user_agent), uid, email, username, id_token, refresh_token,
+                 now + float(expires_in), now)
+            )
+            conn.execute("DELETE FROM sessions WHERE created_at < ?", (now - self.ttl,))
+        return key
+
+    def get(self, key, user_agent):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT uid, email, username, id_token, refresh_token, expires_at FROM sessions "
+                "WHERE key_hash = ? AND agent_hash = ? AND created_at >= ?",
+                (_digest(key), _digest(user_agent), time.time() - self.ttl)
+            ).fetchone()
+        if row is None:
+            return None
+        self._count("restored")
+        return dict(zip(("uid", "email", "username", "id_token", "refresh_token", "expires_at"), row))
+
+    def update_tokens(self, key, id_token, refresh_token, expires_in):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE sessions SET id_token = ?, refresh_token = ?, expires_at = ? WHERE key_hash = ?",
+                (id_token, refresh_token, time.time() + float(expires_in), _digest(key))
+            )
+        self._count("refreshed")
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE key_hash = ?", (_digest(key),))
+
+    def stats(self):
+        with self._connect() as conn:
+            sessions = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        with self._lock:
+            return {"sessions": sessions, "restored": self.restored, "refreshed": self.refreshed}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store():
+    # Returns None when REMEMBER_ME=0
+    global _store
+    if not REMEMBER_ME_ENABLED:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SessionStore(os.path.join(CACHE_DIR, "sessions.sqlite3"))
+    return _store
@@ -0,0 +1,65 @@
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+
+
+def fingerprint(messages, **params):
+    # Exact prompt identity; unlike the response cache key nothing is normalized or truncated
+    payload = {"messages": [[m["role"], m["content"]] for m in messages], **params}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+# ----------------- Single Flight ------------------
+class SingleFlight:
+    """Lets concurrent identical requests share one upstream call."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        # Blocking form: the first caller runs fn, later callers wait for its result
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = Future()
+                self._calls[key] = call
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return call.result()
+        try:
+            result = fn()
+            call.set_result(result)
+            return result
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        finally:
+            self.forget(key, call)
+
+    def share(self, key, factory):
+        # Streaming form: returns (shared, leader); the leader must call forget() when done
+        with self._lock:
+            shared = self._calls.get(key)
+            if shared is not None:
+                self.coalesced += 1
+                return shared, False
+            shared = factory()
+            self._calls[key] = shared
+            self.leaders += 1
+            return shared, True
+
+    def forget(self, key, shared):
+        with self._lock:
+            if self._calls.get(key) is shared:
+                del self._calls[key]
+
+    def stats(self):
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self.leaders, "coalesced": self.coalesced}
@@ -0,0 +1,176 @@
+import bisect
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+# Structured span log; TIMING_LOG=0 keeps only the in-process histograms
+TIMING_LOG = os.getenv("TIMING_LOG", os.path.join("logs", "timings.jsonl"))
+TIMING_LOG_MAX_MB = float(os.getenv("TIMING_LOG_MAX_MB", "10"))
+TIMING_LOG_BACKUPS = int(os.getenv("TIMING_LOG_BACKUPS", "5"))
+
+# Bucket upper bounds in seconds: 1 µs to 8 minutes in 1-2-5 steps
+BUCKETS = [scale * 10 ** exp for exp in range(-6, 3) for scale in (1, 2, 5)]
+
+
+# ----------------- Histograms ------------------
+class LatencyHistogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, pct):
+        # Upper bound of the bucket holding the percentile, capped at the observed maximum
+        if not self.count:
+            return None
+        rank = pct / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max
+        }
+
+
+_histograms = {}
+_lock = threading.Lock()
+# Time spent inside record() itself, to keep the instrumentation honest
+_overhead = LatencyHistogram()
+
+
+# ----------------- Rerun Context ------------------
+# Spans recorded on the script thread are attributed to the session and rerun that started there
+_context = threading.local()
+
+
+def begin_rerun(session, rerun):
+    _context.session = session
+    _context.rerun = rerun
+    _context.started = time.perf_counter()
+
+
+def end_rerun():
+    # Safe to call more than once; only the first call records the rerun
+    started = getattr(_context, "started", None)
+    if started is not None:
+        _context.started = None
+        record("rerun", time.perf_counter() - started)
+
+
+def attributed(task):
+    # Wraps task so the spans it records on a pool thread count toward the calling session and rerun
+    session = getattr(_context, "session", None)
+    rerun = getattr(_context, "rerun", None)
+
+    def run():
+        _context.session, _context.rerun = session, rerun
+        try:
+            return task()
+        finally:
+            # Pool threads serve every session, so nothing carries over to the next task
+            _context.session = _context.rerun = None
+
+    return run
+
+
+# ----------------- Structured Log ------------------
+# Lines are serialized and written on a background thread so a span costs the caller a queue put
+_lines = None
+_lines_lock = threading.Lock()
+
+
+def _write_lines(lines, logger):
+    while True:
+        ts, phase, seconds, session, rerun, fields = lines.get()
+        line = {"ts": round(ts, 3), "phase": phase, "ms": round(seconds * 1000, 3), "session": session, "rerun": rerun}
+        line.update(fields)
+        logger.info(json.dumps(line, default=str))
+
+
+def _get_lines():
+    # Returns None when TIMING_LOG=0
+    global _lines
+    if not TIMING_LOG or TIMING_LOG == "0":
+        return None
+    if _lines is None:
+        with _lines_lock:
+            if _lines is None:
+                logger = logging.getLogger("timing.spans")
+                logger.propagate = False
+                logger.setLevel(logging.INFO)
+                os.makedirs(os.path.dirname(TIMING_LOG) or ".", exist_ok=True)
+                handler = RotatingFileHandler(
+                    TIMING_LOG,
+                    maxBytes=int(TIMING_LOG_MAX_MB * 1024 * 1024),
+                    backupCount=TIMING_LOG_BACKUPS,
+                    encoding="utf-8"
+                )
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+                lines = queue.SimpleQueue()
+                threading.Thread(target=_write_lines, args=(lines, logger), name="timing-log", daemon=True).start()
+                _lines = lines
+    return _lines
+
+
+# ----------------- Spans ------------------
+def record(phase, seconds, **fields):
+    started = time.perf_counter()
+    with _lock:
+        histogram = _histograms.get(phase)
+        if histogram is None:
+            histogram = _histograms[phase] = LatencyHistogram()
+        histogram.add(seconds)
+    lines = _get_lines()
+    if lines is not None:
+        lines.put((time.time(), phase, seconds, getattr(_context, "session", None), getattr(_context, "rerun", None), fields))
+    with _lock:
+        _overhead.add(time.perf_counter() - started)
+
+
+@contextmanager
+def span(phase, **fields):
+    # The yielded dict takes fields only known once the phase has run, such as a row count
+    started = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        record(phase, time.perf_counter() - started, **fields)
+
+
+def snapshot():
+    with _lock:
+        phases = {phase: h.summary() for phase, h in _histograms.items()}
+        phases["timing_overhead"] = _overhead.summary()
+    return phases
+
+
+def reset():
+    global _overhead
+    with _lock:
+        _histograms.clear()
+        _overhead = LatencyHistogram()
@@ -30,6 +30,8 @@ if not firebase_admin._apps:
     cred = credentials.Certificate("key.json")
     firebase_admin.initialize_app(cred)
 db = firestore.client()
+# Login reads only the newest page of chat history; older pages load on request
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "50"))
 
 # ----------------- Industry Data ------------------
 def get_growing_industries():
@@ -153,12 +155,21 @@ def save_message(uid, role, content):
         "timestamp": datetime.datetime.now()
     })
 
-def load_messages(uid):
+def load_messages(uid, limit=HISTORY_PAGE_SIZE, before=None):
+    # The newest `limit` messages older than `before`, oldest first, and whether any older remain
     messages = []
-    docs = db.collection("users").document(uid).collection("chats").order_by("timestamp").stream()
-    for doc in docs:
+    query = db.collection("users").document(uid).collection("chats").order_by(
+        "timestamp", direction=firestore.Query.DESCENDING
+    )
+    if before is not None:
+        query = query.start_after({"timestamp": before})
+    # One extra document tells us whether an older page exists
+    for doc in query.limit(limit + 1).stream():
         messages.append(doc.to_dict())
-    return messages
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    messages.reverse()
+    return messages, has_more
 
 # ----------------- Session Initialization ------------------
 if "logged_in" not in st.session_state:
@@ -232,7 +243,7 @@ with st.sidebar:
                             st.session_state.uid = uid
                             st.session_state.email = email
                             st.session_state.username = username
-                            st.session_state.messages = load_messages(uid)
+                            st.session_state.messages, st.session_state.history_has_more = load_messages(uid)
                             st.rerun()
                         else:
                             st.error(message)
@@ -483,6 +494,14 @@ if st.session_state.logged_in:
             </div>
             """, unsafe_allow_html=True)
             
+        # Older history is fetched a page at a time
+        if st.session_state.get("history_has_more") and st.session_state.messages:
+            if st.button("⬆️ Load older messages", key="load_older"):
+                oldest = st.session_state.messages[0]["timestamp"]
+                older, st.session_state.history_has_more = load_messages(st.session_state.uid, before=oldest)
+                st.session_state.messages[:0] = older
+                st.rerun()
+        
         # Display messages
         for msg in st.session_state.messages:
             if msg['role'] == "user":
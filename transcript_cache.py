@@ -0,0 +1,219 @@
+import datetime
+import os
+from contextlib import contextmanager
+import sqlite3
+import threading
+import time
+
+CACHE_DIR = os.getenv("RESPONSE_CACHE_DIR", ".cache")
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+# Delta syncs re-read this far below the watermark, for chats that reached Firestore after newer ones
+TRANSCRIPT_SYNC_OVERLAP_SECONDS = float(os.getenv("TRANSCRIPT_SYNC_OVERLAP_SECONDS", "900"))
+
+
+def utc_naive(timestamp):
+    # Firestore hands back UTC-aware datetimes for the naive ones it was given
+    if timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def _encode_time(timestamp):
+    # Fixed width, so text order is time order
+    return utc_naive(timestamp).strftime(TIME_FORMAT)
+
+
+def _decode_time(text):
+    return datetime.datetime.strptime(text, TIME_FORMAT)
+
+
+# ----------------- Transcript Cache ------------------
+class TranscriptCache:
+    """Per-user copy of recent chat history in SQLite, kept current by delta sync.
+
+    The watermark is the newest timestamp seen in Firestore, so a returning user
+    only downloads chats written after it. Messages this server writes are not
+    cached directly; the next delta picks them up with everything written
+    elsewhere. Users are evicted least recently used first once the cache passes
+    max_bytes.
+    """
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.synced = 0
+        self.evictions = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    uid TEXT NOT NULL,
+                    id TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    PRIMARY KEY (uid, id)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS messages_time ON messages (uid, timestamp)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    uid TEXT PRIMARY KEY,
+                    watermark TEXT,
+                    older_remaining INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    @contextmanager
+    def _write(self):
+        # BEGIN IMMEDIATE takes the write lock up front. A deferred transaction that reads first
+        # cannot wait for it later and fails with "database is locked" under concurrent logins.
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def _count(self, name, n=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def watermark(self, uid):
+        # None when nothing is cached for this user yet
+        with self._connect() as conn:
+            row = conn.execute("SELECT watermark FROM users WHERE uid = ?", (uid,)).fetchone()
+        self._count("hits" if row else "misses")
+        return _decode_time(row[0]) if row and row[0] else None
+
+    def merge(self, uid, messages, older_remaining=None):
+        """Stores messages read from Firestore and advances the watermark past them.
+
+        older_remaining says whether Firestore still has messages older than the
+        oldest cached one; None leaves the previous answer in place.
+        """
+        now = time.time()
+        rows = [
+            (uid, m["id"], m["role"], m["content"], _encode_time(m["timestamp"]))
+            for m in messages if m.get("id") and m.get("timestamp")
+        ]
+        with self._write() as conn:
+            if rows:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO messages (uid, id, role, content, timestamp) VALUES (?, ?, ?, ?, ?)", rows
+                )
+            newest = max((row[4] for row in rows), default=None)
+            size = conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(content)), 0) FROM messages WHERE uid = ?", (uid,)
+            ).fetchone()[0]
+            user = conn.execute("SELECT watermark, older_remaining FROM users WHERE uid = ?", (uid,)).fetchone()
+            if user:
+                watermark = max(filter(None, (user[0], newest)), default=None)
+                remaining = user[1] if older_remaining is None else int(older_remaining)
+            else:
+                watermark = newest
+                remaining = 1 if older_remaining is None else int(older_remaining)
+            conn.execute(
+                "INSERT OR REPLACE INTO users (uid, watermark, older_remaining, size, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (uid, watermark, remaining, size, now)
+            )
+            self._evict(conn, keep=uid)
+        self._count("synced", len(rows))
+
+    def page(self, uid, limit, before=None):
+        """Up to `limit` cached messages older than `before`, oldest first.
+
+        Also returns whether older messages exist, in the cache or in Firestore.
+        """
+        with self._write() as conn:
+            if before is None:
+                rows = conn.execute(
+                    "SELECT id, role, content, timestamp FROM messages WHERE uid = ? ORDER BY timestamp DESC LIMIT ?",
+                    (uid, limit + 1)
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT id, role, content, timestamp FROM messages WHERE uid = ? AND timestamp < ? "
+                    "ORDER BY timestamp DESC LIMIT ?",
+                    (uid, _encode_time(before), limit + 1)
+                ).fetchall()
+            user = conn.execute("SELECT older_remaining FROM users WHERE uid = ?", (uid,)).fetchone()
+            conn.execute("UPDATE users SET accessed_at = ? WHERE uid = ?", (time.time(), uid))
+        messages = [
+            {"id": r[0], "role": r[1], "content": r[2], "timestamp": _decode_time(r[3])}
+            for r in reversed(rows[:limit])
+        ]
+        return messages, len(rows) > limit or bool(user and user[0])
+
+    def invalidate(self, uid):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM messages WHERE uid = ?", (uid,))
+            conn.execute("DELETE FROM users WHERE uid = ?", (uid,))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM messages")
+            conn.execute("DELETE FROM users")
+
+    def _evict(self, conn, keep=None):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM users").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used users until we are back under 90% of the cap
+        target = total - int(self.max_bytes * 0.9)
+        freed = 0
+        for uid, size in conn.execute("SELECT uid, size FROM users ORDER BY accessed_at").fetchall():
+            if freed >= target:
+                break
+            if uid == keep:
+                continue
+            conn.execute("DELETE FROM messages WHERE uid = ?", (uid,))
+            conn.execute("DELETE FROM users WHERE uid = ?", (uid,))
+            freed += size
+            self._count("evictions")
+
+    def stats(self):
+        with self._connect() as conn:
+            users, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM users").fetchone()
+        with self._lock:
+            return {
+                "users": users,
+                "bytes": size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "synced_messages": self.synced,
+                "evictions": self.evictions
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_transcript_cache():
+    # Returns None when TRANSCRIPT_CACHE=0
+    global _cache
+    if os.getenv("TRANSCRIPT_CACHE", "1") == "0":
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TranscriptCache(
+                    os.path.join(CACHE_DIR, "transcripts.sqlite3"),
+                    max_bytes=int(float(os.getenv("TRANSCRIPT_CACHE_MAX_MB", "64")) * 1024 * 1024)
+                )
+    return _cache